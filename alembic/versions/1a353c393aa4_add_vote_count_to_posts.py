@@ -0,0 +1,34 @@
+"""add vote_count to posts
+
+Revision ID: 1a353c393aa4
+Revises: 0d5a82f48b82
+Create Date: 2026-10-18 09:40:51.602377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a353c393aa4'
+down_revision: Union[str, Sequence[str], None] = '0d5a82f48b82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('vote_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # Backfill from the votes table, posts without votes keep the default 0
+    op.execute("""
+        UPDATE posts SET vote_count = counts.total
+        FROM (SELECT post_id, count(*) AS total FROM votes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'vote_count')
@@ -0,0 +1,29 @@
+"""add version to posts for ETags
+
+Revision ID: 50eeb24e37e5
+Revises: ed867b49a244
+Create Date: 2026-10-18 19:12:36.208417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50eeb24e37e5'
+down_revision: Union[str, Sequence[str], None] = 'ed867b49a244'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default, Postgres 11+ adds the column without rewriting the table
+    op.add_column('posts', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'version')
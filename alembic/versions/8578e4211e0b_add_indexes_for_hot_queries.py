@@ -0,0 +1,34 @@
+"""add indexes for post listing, owner and per-post vote lookups
+
+Revision ID: 8578e4211e0b
+Revises: aadf78ae5f48
+Create Date: 2026-10-18 13:12:09.318524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8578e4211e0b'
+down_revision: Union[str, Sequence[str], None] = 'aadf78ae5f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps posts and votes writable while the indexes build, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_posts_owner_id', 'posts', ['owner_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_votes_post_id', 'votes', ['post_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_votes_post_id', table_name='votes', postgresql_concurrently=True)
+        op.drop_index('ix_posts_owner_id', table_name='posts', postgresql_concurrently=True)
+        op.drop_index('ix_posts_created_at_id', table_name='posts', postgresql_concurrently=True)
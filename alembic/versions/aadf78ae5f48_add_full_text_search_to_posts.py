@@ -0,0 +1,50 @@
+"""add full-text search vector and trigram index to posts
+
+Revision ID: aadf78ae5f48
+Revises: 1a353c393aa4
+Create Date: 2026-10-18 11:05:37.480211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aadf78ae5f48'
+down_revision: Union[str, Sequence[str], None] = '1a353c393aa4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Stored generated column: Postgres computes it for existing rows by rewriting the whole
+    # table, under an ACCESS EXCLUSIVE lock that blocks reads and writes until it is done
+    op.add_column('posts', sa.Column(
+        'search_vector', 
+        postgresql.TSVECTOR(), 
+        sa.Computed("to_tsvector('english', title || ' ' || content)", persisted=True), 
+        nullable=True
+    ))
+    # CONCURRENTLY keeps posts writable while the indexes build, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_search_vector', 'posts', ['search_vector'], unique=False, 
+            postgresql_using='gin', postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_posts_title_trgm', 'posts', ['title'], unique=False, 
+            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_posts_title_trgm', table_name='posts', postgresql_concurrently=True)
+        op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_concurrently=True)
+    op.drop_column('posts', 'search_vector')
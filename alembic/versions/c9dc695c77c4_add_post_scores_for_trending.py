@@ -0,0 +1,51 @@
+"""add votes.created_at and post_scores for the trending feed
+
+Revision ID: c9dc695c77c4
+Revises: 8578e4211e0b
+Create Date: 2026-10-18 14:02:51.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9dc695c77c4'
+down_revision: Union[str, Sequence[str], None] = '8578e4211e0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing votes get the migration's time, their posts are scored by the backfill below anyway
+    op.add_column('votes', sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_table(
+        'post_scores',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_scores_score_post_id', 'post_scores', ['score', 'post_id'], unique=False)
+    # Same formula as queries.hot_score
+    op.execute("""
+        INSERT INTO post_scores (post_id, score, updated_at)
+        SELECT id, log(greatest(vote_count, 1)) + (extract(epoch FROM created_at) - 1134028003) / 45000, now()
+        FROM posts
+    """)
+    # votes is the largest table: CONCURRENTLY keeps it writable while the index builds, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_votes_created_at', 'votes', ['created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_votes_created_at', table_name='votes', postgresql_concurrently=True)
+    op.drop_index('ix_post_scores_score_post_id', table_name='post_scores')
+    op.drop_table('post_scores')
+    op.drop_column('votes', 'created_at')
@@ -0,0 +1,44 @@
+"""add user_stats with per-user post and vote totals
+
+Revision ID: ed867b49a244
+Revises: c9dc695c77c4
+Create Date: 2026-10-18 18:41:07.512934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ed867b49a244'
+down_revision: Union[str, Sequence[str], None] = 'c9dc695c77c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('votes_received', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    # Same statement as queries.rebuild_user_stats
+    op.execute("""
+        INSERT INTO user_stats (user_id, post_count, votes_received)
+        SELECT users.id, count(DISTINCT posts.id), count(votes.post_id)
+        FROM users
+        LEFT OUTER JOIN posts ON posts.owner_id = users.id
+        LEFT OUTER JOIN votes ON votes.post_id = posts.id
+        GROUP BY users.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
@@ -0,0 +1,227 @@
+"""
+# Bulk post import
+
+POST /posts/bulk takes a JSON array of posts, or NDJSON (Content-Type: application/x-ndjson)
+which is read from the request stream as it arrives. Posts are validated one at a time and
+written in chunks, one transaction per chunk, together with the owner's user_stats:
+
+- bodies under POST_BULK_COPY_MIN_BYTES go through INSERT ... VALUES ... RETURNING id,
+  POST_BULK_CHUNK_SIZE posts per chunk
+- larger bodies, and uploads streamed without a Content-Length, go through COPY,
+  POST_BULK_COPY_CHUNK_SIZE posts per chunk, with their ids reserved from the posts
+  sequence beforehand since COPY returns nothing
+
+Every post gets its id or the reason it was rejected. A chunk the database rejects fails
+as a whole and the import carries on with the next one.
+"""
+import csv
+import io
+import orjson
+import psycopg2
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import queries, schemas
+from .config import settings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+COPY_COLUMNS = ("id", "title", "content", "published", "owner_id")
+COPY_SQL = f"COPY posts ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Documents both body formats, the handlers read the body themselves
+OPENAPI_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/PostCreate"}}
+            },
+            NDJSON_MEDIA_TYPE: {
+                "schema": {"$ref": "#/components/schemas/PostCreate"}
+            }
+        }
+    }
+}
+
+def uses_copy(
+    request: Request
+):
+    length = request.headers.get("Content-Length")
+    return length is None or int(length) >= settings.post_bulk_copy_min_bytes
+
+async def _items(
+    request: Request
+):
+    # Raw posts: NDJSON lines as bytes, or the decoded items of a JSON array
+    if request.headers.get("Content-Type", "").startswith(NDJSON_MEDIA_TYPE):
+        pending = b""
+        async for data in request.stream():
+            *lines, pending = (pending + data).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if pending.strip():
+            yield pending
+        return
+
+    try:
+        items = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        items = None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Expected a JSON array of posts, or NDJSON with Content-Type: application/x-ndjson"
+        )
+    for item in items:
+        yield item
+
+def _validate(
+    item
+):
+    try:
+        if isinstance(item, bytes):
+            post = schemas.PostCreate.model_validate_json(item)
+        else:
+            post = schemas.PostCreate.model_validate(item)
+    except ValidationError as error:
+        return None, "; ".join(
+            f"{'.'.join(map(str, e['loc'])) or 'post'}: {e['msg']}" for e in error.errors(include_url=False)
+        )
+
+    # Postgres text cannot hold NUL, it would fail the post's whole chunk
+    if "\x00" in post.title or "\x00" in post.content:
+        return None, "post: text cannot contain NUL characters"
+    return post, None
+
+def _rejected(
+    error: exc.DBAPIError
+):
+    return f"chunk rejected by the database: {str(error.orig).splitlines()[0]}"
+
+async def import_posts(
+    request: Request,
+    write_chunk
+):
+    # write_chunk(posts, use_copy) writes and commits one chunk and returns the new ids in order
+    use_copy = uses_copy(request)
+    chunk_size = settings.post_bulk_copy_chunk_size if use_copy else settings.post_bulk_chunk_size
+    results, chunk = [], []
+    created = 0
+
+    async def flush():
+        nonlocal created
+        posts = [post for post, _ in chunk]
+        try:
+            ids = await write_chunk(posts, use_copy)
+        except exc.DBAPIError as error:
+            for _, result in chunk:
+                result["error"] = _rejected(error)
+        else:
+            for id, (_, result) in zip(ids, chunk):
+                result["id"] = id
+            created += len(ids)
+        chunk.clear()
+
+    index = 0
+    async for item in _items(request):
+        post, error = _validate(item)
+        result = {"index": index, "id": None, "error": error}
+        results.append(result)
+        index += 1
+        if post is not None:
+            chunk.append((post, result))
+            if len(chunk) >= chunk_size:
+                await flush()
+    if chunk:
+        await flush()
+
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+def _rows(
+    owner_id: int,
+    posts: list[schemas.PostCreate]
+):
+    return [{**post.model_dump(), "owner_id": owner_id} for post in posts]
+
+def _copy(
+    db: Session,
+    ids: list[int],
+    owner_id: int,
+    posts: list[schemas.PostCreate]
+):
+    buffer = io.StringIO()
+    # Quoting everything keeps empty strings apart from NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    writer.writerows((id, post.title, post.content, post.published, owner_id) for id, post in zip(ids, posts))
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(COPY_SQL, buffer)
+    except psycopg2.Error as error:
+        # The raw cursor bypasses SQLAlchemy's exception wrapping
+        raise exc.DBAPIError(COPY_SQL, None, error)
+    finally:
+        cursor.close()
+
+def write_chunk(
+    db: Session,
+    owner_id: int,
+    posts: list[schemas.PostCreate],
+    use_copy: bool
+):
+    try:
+        if use_copy:
+            ids = db.scalars(queries.reserve_post_ids(len(posts))).all()
+            _copy(db, ids, owner_id, posts)
+        else:
+            ids = db.scalars(queries.insert_posts(), _rows(owner_id, posts)).all()
+        db.execute(queries.count_new_posts(owner_id, len(posts)))
+        db.commit()
+    except exc.DBAPIError:
+        db.rollback()
+        raise
+    return ids
+
+async def _copy_async(
+    db: AsyncSession,
+    ids: list[int],
+    owner_id: int,
+    posts: list[schemas.PostCreate]
+):
+    # Only reached in async mode, where asyncpg is installed
+    import asyncpg
+
+    # asyncpg's binary COPY, inside the transaction the sequence read started
+    connection = await (await db.connection()).get_raw_connection()
+    try:
+        await connection.driver_connection.copy_records_to_table(
+            "posts",
+            records=[(id, post.title, post.content, post.published, owner_id) for id, post in zip(ids, posts)],
+            columns=COPY_COLUMNS
+        )
+    except asyncpg.PostgresError as error:
+        raise exc.DBAPIError(COPY_SQL, None, error)
+
+async def write_chunk_async(
+    db: AsyncSession,
+    owner_id: int,
+    posts: list[schemas.PostCreate],
+    use_copy: bool
+):
+    try:
+        if use_copy:
+            ids = (await db.scalars(queries.reserve_post_ids(len(posts)))).all()
+            await _copy_async(db, ids, owner_id, posts)
+        else:
+            ids = (await db.scalars(queries.insert_posts(), _rows(owner_id, posts))).all()
+        await db.execute(queries.count_new_posts(owner_id, len(posts)))
+        await db.commit()
+    except exc.DBAPIError:
+        await db.rollback()
+        raise
+    return ids
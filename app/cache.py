@@ -0,0 +1,171 @@
+"""
+# Caches
+
+TTLCache is the in-process LRU backend, RedisCache keeps entries in a shared
+Redis (or anything speaking its protocol). Both expose get/set/delete/clear/stats.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from .config import settings
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(
+        self, 
+        maxsize: int, 
+        ttl: float
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, 
+        key: Hashable, 
+        default: Any = None
+    ):
+        with self._lock:
+            expires_at, value = self._entries.get(key, (0.0, _MISSING))
+            if value is _MISSING or expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self, 
+        key: Hashable, 
+        value: Any, 
+        ttl: Optional[float] = None
+    ):
+        # A per-entry ttl can only shorten the cache-wide one
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(
+        self, 
+        key: Hashable
+    ):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+class RedisCache:
+    def __init__(
+        self, 
+        client, 
+        ttl: float, 
+        namespace: str
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable):
+        return f"{self.namespace}:{key}"
+
+    def get(
+        self, 
+        key: Hashable, 
+        default: Any = None
+    ):
+        value = self.client.get(self._key(key))
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(
+        self, 
+        key: Hashable, 
+        value: Any, 
+        ttl: Optional[float] = None
+    ):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl > 0:
+            self.client.set(self._key(key), value, px=int(ttl * 1000))
+
+    def delete(
+        self, 
+        key: Hashable
+    ):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            self.client.delete(key)
+
+    def stats(self):
+        import redis
+
+        try:
+            # Server-wide, Redis does not track evictions per key prefix
+            evictions = self.client.info("stats").get("evicted_keys")
+        except redis.RedisError:
+            evictions = None
+
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": evictions
+        }
+
+def make_cache(
+    namespace: str, 
+    maxsize: int, 
+    ttl: float
+):
+    if settings.cache_backend == "redis":
+        # Optional dependency, only needed for the shared backend: pip install redis
+        import redis
+
+        return RedisCache(redis.Redis.from_url(settings.redis_url), ttl=ttl, namespace=namespace)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+# ETag and serialized schemas.PostOut body by post id (see app/conditional.py), invalidated by every write to the post or its votes
+post_cache = make_cache("post", settings.post_cache_size, settings.post_cache_ttl)
+
+# Serialized schemas.UserOut bodies by user id, see app/lookups.py
+user_cache = make_cache("user", settings.user_cache_size, settings.user_cache_ttl)
+
+# post_id -> owner_id, a post never changes owner so only deleting it invalidates an entry
+post_owner_cache = make_cache("post_owner", settings.post_owner_cache_size, settings.post_owner_cache_ttl)
@@ -0,0 +1,59 @@
+"""
+# Conditional GETs for the post endpoints
+
+A post's ETag is made of its id, version (bumped by every edit) and vote_count, which are
+loaded with the row anyway. A page's ETag hashes those of its posts. Both are compared to
+If-None-Match before anything is serialized, a match answers 304 Not Modified with no
+body. Owners are left out: a user's email and created_at never change.
+
+post_cache entries keep the ETag in front of the body, so cache hits need no query.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response, status
+
+def post_etag(
+    row
+):
+    # row is a (Post, Votes) row
+    return f'"{row.Post.id}.{row.Post.version}.{row.Votes}"'
+
+def posts_etag(
+    rows: list
+):
+    versions = ",".join(f"{row.Post.id}.{row.Post.version}.{row.Votes}" for row in rows)
+    return f'"{hashlib.blake2b(versions.encode(), digest_size=12).hexdigest()}"'
+
+def matches(
+    request: Request,
+    etag: str
+):
+    if_none_match: Optional[str] = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 specifies for If-None-Match
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def not_modified(
+    etag: str,
+    headers: Optional[dict] = None
+):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**(headers or {}), "ETag": etag})
+
+def pack(
+    etag: str,
+    body: bytes
+):
+    # Serialized JSON never contains a raw newline, so it separates the two
+    return etag.encode() + b"\n" + body
+
+def unpack(
+    entry: bytes
+):
+    etag, separator, body = entry.partition(b"\n")
+    if not separator:
+        # Cached before entries carried their ETag, they expire within settings.post_cache_ttl
+        return None, entry
+    return etag.decode(), body
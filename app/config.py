@@ -1,6 +1,9 @@
-from pydantic_settings import BaseSettings
+from typing import Literal, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env")
+
     database_hostname: str
     database_port: str
     database_password: str
@@ -9,8 +12,77 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
-    
-    class Config:
-        env_file=".env"
+    # Serve the routers from app/routers/aio on an asyncpg AsyncEngine
+    database_async: bool = False
+    # Connection pool, per engine and per worker process
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = -1
+    database_pool_pre_ping: bool = False
+    # Connections all the workers of python -m app.serve may open together, per database server
+    database_max_connections: int = 90
+    # Open a fresh connection per checkout, for running behind PgBouncer
+    database_null_pool: bool = False
+    # Read replicas (SQLAlchemy URLs, JSON list) for the read-only routes, how long an unreachable
+    # replica is skipped, and how long a user who wrote keeps reading from the primary
+    database_replica_urls: list[str] = []
+    database_replica_retry_seconds: float = 5
+    read_your_writes_seconds: float = 5
+    read_your_writes_cache_size: int = 100000
+    # bcrypt cost factor, each +1 doubles the time per hash
+    bcrypt_rounds: int = 12
+    # Password hashing processes (None = one per CPU, 0 = hash inline) and max calls in flight
+    password_hash_workers: Optional[int] = None
+    password_hash_queue_size: int = 64
+    # Verified-token cache (0 disables it) and the JWT library, "pyjwt" needs PyJWT installed
+    token_cache_size: int = 10000
+    token_cache_ttl: float = 300
+    jwt_backend: Literal["jose", "pyjwt"] = "jose"
+    # Response caches, "redis" needs the redis package and a server at redis_url
+    cache_backend: Literal["memory", "redis"] = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    post_cache_size: int = 10000
+    post_cache_ttl: float = 60
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60
+    post_owner_cache_size: int = 100000
+    post_owner_cache_ttl: float = 3600
+    # POST /posts/bulk: posts per INSERT and transaction, and from which body size (bytes) it
+    # switches to COPY, copy_chunk_size posts per transaction
+    post_bulk_chunk_size: int = 1000
+    post_bulk_copy_min_bytes: int = 1048576
+    post_bulk_copy_chunk_size: int = 50000
+    # Most votes accepted by one POST /vote/batch request
+    vote_batch_max_size: int = 500
+    # Write-behind POST /vote/: queue votes in memory and flush them in batches every
+    # vote_flush_ms or vote_flush_size votes, vote_queue_size pending votes answer 503
+    vote_write_behind: bool = False
+    vote_flush_ms: float = 100
+    vote_flush_size: int = 500
+    vote_queue_size: int = 10000
+    # A flush that hits a deadlock, a serialization failure or a lost connection is retried
+    # vote_flush_retries times, backing off from vote_flush_retry_ms, before its votes are dropped
+    vote_flush_retries: int = 3
+    vote_flush_retry_ms: float = 50
+    # Seconds between incremental refreshes of the trending scores, 0 disables the refresher
+    trending_refresh_seconds: float = 30
+    # Rows fetched per server-side cursor round trip by GET /posts/export, and its gzip level (1-9)
+    export_batch_size: int = 2000
+    export_gzip_level: int = 6
+    # python -m app.serve: worker processes (None = one per CPU), listen backlog, idle keep-alive
+    # and how long a stopping worker may take to finish its in-flight requests
+    web_concurrency: Optional[int] = None
+    server_backlog: int = 2048
+    keep_alive_seconds: int = 5
+    graceful_timeout_seconds: int = 30
+    # Warm up before serving (see app/warmup.py) and how many connections to open per pool
+    warmup: bool = True
+    warmup_connections: int = 5
+    # Shared secret for the /metrics endpoints, sent in the X-Metrics-Token header. Unset, they answer 404.
+    metrics_token: Optional[str] = None
+    # Server-Timing header with per-request DB time, and the latency (ms) above which a request logs each query
+    server_timing_header: bool = True
+    slow_request_ms: Optional[float] = None
 
 settings = Settings()
\ No newline at end of file
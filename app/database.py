@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from .config import settings
+from .metrics import Histogram
+from .profiling import current_profile
 from urllib.parse import quote_plus
 
 # Encode the password to handle special characters
@@ -13,10 +18,100 @@ SQLALCHEMY_DATABASE_URL = (
     f"{settings.database_port}/{settings.database_name}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("+psycopg2", "+asyncpg", 1)
+
+class InstrumentedPool:
+    # Records how long each checkout waits for a connection, including opening a new one
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(
+    poolclass: type
+):
+    if settings.database_null_pool:
+        # PgBouncer owns the pooling, asyncpg must not keep prepared statements across transactions
+        return {
+            "poolclass": NullPool,
+            "connect_args": {"statement_cache_size": 0} if poolclass is InstrumentedAsyncAdaptedQueuePool else {}
+        }
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping
+    }
+
+def pool_stats(
+    engine
+):
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"pool": type(pool).__name__}
+
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool.overflow() is negative until the pool has opened pool_size connections
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.database_max_overflow,
+        "checkout_timeouts": pool.checkout_timeouts,
+        "checkout_wait_seconds": pool.checkout_wait.snapshot()
+    }
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and context is not None:
+        profile.record(statement, time.perf_counter() - context._query_start)
+
+def instrument_engine(
+    engine
+):
+    # Counts and times every statement against the request that issued it, see app/profiling.py
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(InstrumentedQueuePool))
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine is only built in async mode, so asyncpg stays optional otherwise
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL, **pool_options(InstrumentedAsyncAdaptedQueuePool)
+) if settings.database_async else None
+
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -24,4 +119,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+# Cached user and post-owner lookups
+
+The user cache holds serialized schemas.UserOut bodies. GET /users/{id} serves them
+as they are, and get_current_user_record parses them when a handler needs more than
+the token's user id. The post-owner cache answers the ownership checks of
+update_post, delete_post and vote without a round trip. Whatever updates or deletes
+a post calls invalidate_post. Users are never changed or deleted through the API, so
+their cached bodies only expire with settings.user_cache_ttl.
+"""
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import models, oauth2, schemas, serialization
+from .cache import post_cache, post_owner_cache, user_cache
+from .database import get_async_db, get_db
+
+def user_body(
+    db: Session,
+    id: int
+):
+    body = user_cache.get(id)
+    if body is None:
+        user = db.get(models.User, id)
+        if user is None:
+            return None
+        body = serialization.dump_user(user)
+        user_cache.set(id, body)
+    return body
+
+async def user_body_async(
+    db: AsyncSession,
+    id: int
+):
+    body = user_cache.get(id)
+    if body is None:
+        user = await db.get(models.User, id)
+        if user is None:
+            return None
+        body = serialization.dump_user(user)
+        user_cache.set(id, body)
+    return body
+
+def cached_post_owner(
+    post_id: int
+):
+    # Never touches the database, None when the owner is not cached
+    owner_id = post_owner_cache.get(post_id)
+    return int(owner_id) if owner_id is not None else None
+
+def remember_post_owner(
+    post_id: int,
+    owner_id: int
+):
+    post_owner_cache.set(post_id, owner_id)
+
+def post_owner(
+    db: Session,
+    post_id: int
+):
+    # owner_id of the post, None when it does not exist
+    owner_id = cached_post_owner(post_id)
+    if owner_id is None:
+        owner_id = db.scalar(select(models.Post.owner_id).where(models.Post.id == post_id))
+        if owner_id is not None:
+            remember_post_owner(post_id, owner_id)
+    return owner_id
+
+async def post_owner_async(
+    db: AsyncSession,
+    post_id: int
+):
+    owner_id = cached_post_owner(post_id)
+    if owner_id is None:
+        owner_id = await db.scalar(select(models.Post.owner_id).where(models.Post.id == post_id))
+        if owner_id is not None:
+            remember_post_owner(post_id, owner_id)
+    return owner_id
+
+def invalidate_post(
+    id: int
+):
+    post_owner_cache.delete(id)
+    post_cache.delete(id)
+
+def _current_user(
+    body: Optional[bytes]
+):
+    if body is None:
+        # Valid token of a user that no longer exists
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return schemas.UserOut.model_validate_json(body)
+
+def get_current_user_record(
+    current_user: schemas.TokenData = Depends(oauth2.get_current_user),
+    db: Session = Depends(get_db)
+):
+    # get_current_user resolved to the full user, for handlers that need more than the id
+    return _current_user(user_body(db, current_user.id))
+
+async def get_current_user_record_async(
+    current_user: schemas.TokenData = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return _current_user(await user_body_async(db, current_user.id))
@@ -1,11 +1,50 @@
-from fastapi import FastAPI
-from .routers import post, user, auth,vote
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from .config import settings
+from . import trending, utils, warmup
+from .vote_queue import vote_queue
+from .profiling import ProfilingMiddleware
+from .utils import PasswordHasherBusy
+from .routers import health, metrics
+
+if settings.database_async:
+    from .routers.aio import post, user, auth, vote
+else:
+    from .routers import post, user, auth,vote
 
 # Bind models to the database
 # models.Base.metadata.create_all(bind=engine) # We already have alembic
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(
+    app: FastAPI
+):
+    # Awaited, so the worker only starts accepting connections once it is warm
+    if settings.warmup:
+        await warmup.warm_up(app)
+    else:
+        warmup.state.warmed_up = True
+
+    refresher = None
+    if settings.trending_refresh_seconds > 0:
+        refresher = asyncio.create_task(trending.refresh_forever(settings.trending_refresh_seconds))
+    if settings.vote_write_behind:
+        vote_queue.start()
+
+    yield
+
+    # Flush every queued vote before the process exits
+    await vote_queue.stop()
+    utils.shutdown()
+    if refresher is not None:
+        refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresher
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 origins = [
     "*"
@@ -17,12 +56,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin clients can only read these when exposed: the next page cursor and conditional GETs need them
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Outermost, so its timings cover the other middleware too
+app.add_middleware(ProfilingMiddleware)
+
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy(
+    request: Request, 
+    exc: PasswordHasherBusy
+):
+    # Shed load instead of letting logins queue behind a saturated hashing pool
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
 app.include_router(vote.router)
 app.include_router(post.router)
 app.include_router(user.router)
 app.include_router(auth.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,57 @@
+"""
+# Maintenance commands
+
+Run with: python -m app.maintenance <command>
+"""
+import argparse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models, queries, trending
+from .database import SessionLocal
+
+def reconcile_vote_counts(
+    db: Session
+):
+    # Recount votes for every post whose denormalized vote_count has drifted
+    actual = select(func.count(models.Vote.post_id)).where(
+        models.Vote.post_id == models.Post.id
+    ).scalar_subquery()
+
+    fixed = db.query(models.Post).filter(models.Post.vote_count != actual).update(
+        {models.Post.vote_count: actual}, synchronize_session=False
+    )
+    db.commit()
+    return fixed
+
+def rebuild_user_stats(
+    db: Session
+):
+    # Recounts user_stats from posts and votes, for drift or rows written outside the API
+    rebuilt = db.execute(queries.rebuild_user_stats()).rowcount
+    db.commit()
+    return rebuilt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reconcile-votes", help="Fix posts.vote_count drift against the votes table")
+    commands.add_parser("rebuild-scores", help="Recompute the trending score of every post")
+    commands.add_parser("rebuild-user-stats", help="Recompute every user's post count and votes received")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "reconcile-votes":
+            fixed = reconcile_vote_counts(db)
+            print(f"Reconciled vote_count on {fixed} post(s)")
+        elif args.command == "rebuild-scores":
+            refreshed = trending.refresh_scores(db)
+            print(f"Rebuilt the trending score of {refreshed} post(s)")
+        elif args.command == "rebuild-user-stats":
+            rebuilt = rebuild_user_stats(db)
+            print(f"Rebuilt the stats of {rebuilt} user(s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+# In-process metrics reported by the /metrics endpoints
+"""
+import threading
+
+# Seconds, upper bounds in the Prometheus "le" style
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    def __init__(
+        self, 
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(
+        self, 
+        value: float
+    ):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        # Cumulative counts, so every bucket includes the faster ones
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            cumulative[bound] = running
+
+        return {
+            "buckets": cumulative,
+            "count": running,
+            "sum": total
+        }
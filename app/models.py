@@ -1,5 +1,6 @@
-from sqlalchemy.orm import relationship
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, text
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy import Column, Computed, Float, ForeignKey, Index, Integer, String, Boolean, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 from .database import Base
 
@@ -13,9 +14,28 @@ class Post(Base):
     published = Column(Boolean, server_default='TRUE', nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     owner_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'),nullable=False)
+    # Denormalized count of rows in votes, maintained by the vote router
+    vote_count = Column(Integer, nullable=False, server_default=text('0'))
+    # Bumped by every edit, together with id and vote_count it makes the post's ETag
+    version = Column(Integer, nullable=False, server_default=text('1'))
+    # Full-text search document, generated by Postgres and never loaded with the post
+    search_vector = deferred(Column(
+        TSVECTOR, 
+        Computed("to_tsvector('english', title || ' ' || content)", persisted=True)
+    ))
 
     owner = relationship("User")
 
+    __table_args__ = (
+        # Newest-first listing and its keyset cursor, scanned backwards for ORDER BY created_at DESC, id DESC
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # ON DELETE CASCADE from users, and per-owner lookups
+        Index("ix_posts_owner_id", "owner_id"),
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram index (pg_trgm) so substring LIKE/ILIKE on title can avoid a sequential scan
+        Index("ix_posts_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -30,4 +50,34 @@ class Vote(Base):
 
     user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
     post_id = Column(Integer, ForeignKey("posts.id", ondelete='CASCADE'), primary_key=True) 
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+    __table_args__ = (
+        # The primary key leads with user_id, votes of one post (cascades, recounts) need their own index
+        Index("ix_votes_post_id", "post_id"),
+        # Recent votes, read by the trending refresher
+        Index("ix_votes_created_at", "created_at"),
+    )
+
+class PostScore(Base):
+    # Precomputed trending score per post, maintained by app/trending.py
+    __tablename__ = "post_scores"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete='CASCADE'), primary_key=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
 
+    __table_args__ = (
+        # GET /posts/trending reads this index in order and stops after one page
+        Index("ix_post_scores_score_post_id", "score", "post_id"),
+    )
+
+
+class UserStats(Base):
+    # Per-user totals for GET /users/{id}/stats, kept up to date by the post and vote routers
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    post_count = Column(Integer, nullable=False, server_default=text('0'))
+    # Votes on all of the user's posts, the sum of their vote_count
+    votes_received = Column(Integer, nullable=False, server_default=text('0'))
@@ -1,8 +1,11 @@
+import hashlib
+import time
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app import schemas
+from .cache import TTLCache
 from .config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -12,6 +15,32 @@ SECRET_KEY = f"{settings.secret_key}"
 ALGORITHM = f"{settings.algorithm}"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+if settings.jwt_backend == "pyjwt":
+    # Optional dependency (pip install PyJWT), decodes HS256 tokens roughly twice as fast as python-jose
+    import jwt as pyjwt
+
+    def _encode(claims: dict):
+        return pyjwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def _decode(token: str):
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except pyjwt.PyJWTError as error:
+            raise JWTError(str(error))
+else:
+    def _encode(claims: dict):
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def _decode(token: str):
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def warm_up():
+    # Loads the JWT backend's crypto code, the first authenticated request would pay for it otherwise
+    _decode(_encode({"user_id": 0}))
+
+# Verified tokens keyed by their SHA-256 digest, entries never outlive the token's exp
+token_cache = TTLCache(maxsize=settings.token_cache_size, ttl=settings.token_cache_ttl)
+
 def create_access_token(
     data: dict
 ):
@@ -21,7 +50,7 @@ def create_access_token(
 
     to_encode.update({"exp": expire})
 
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _encode(to_encode)
     
     return encoded_jwt
 
@@ -29,11 +58,16 @@ def verify_access_token(
     token: str, 
     credentials_exception
 ):
+    cache_key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(cache_key)
+    if token_data is not None:
+        return token_data
+
     try:
         # here we decode the token
         # the payload is the data we encoded in create_access_token function
         # we expect to find the user_id in the payload
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode(token)
         id: int = payload.get("user_id")
 
         if id is None:
@@ -43,6 +77,9 @@ def verify_access_token(
     except JWTError:
         raise credentials_exception
 
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(cache_key, token_data, ttl=expires_in)
+
     return token_data
 
 def get_current_user(
@@ -53,4 +90,4 @@ def get_current_user(
         detail="Could not validate credentials", 
         headers={"WWW-Authenticate": "Bearer"}
     )
-    return verify_access_token(token, credentials_exception)
\ No newline at end of file
+    return verify_access_token(token, credentials_exception)
@@ -0,0 +1,62 @@
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, status
+from . import queries, schemas
+
+# Cursors are opaque to clients: base64 of "<created_at>|<id>" for the last row of a page.
+# They resume listing with a (created_at, id) seek instead of OFFSET.
+
+def encode_cursor(
+    created_at: datetime,
+    id: int
+):
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(
+    cursor: str
+):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def next_cursor(
+    rows: list,
+    limit: int
+):
+    # A short page means there is nothing left to resume from
+    if not rows or len(rows) < limit:
+        return None
+    last_post = rows[-1].Post
+    return encode_cursor(last_post.created_at, last_post.id)
+
+def posts_page(
+    search: Optional[str], 
+    search_mode: schemas.SearchMode, 
+    cursor: Optional[str], 
+    skip: int, 
+    limit: int
+):
+    # Returns the page statement and whether its rows can be resumed with a cursor
+    if search and search_mode == schemas.SearchMode.FULLTEXT:
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Full-text results are ranked, page them with skip instead of cursor"
+            )
+        return queries.search_posts(search).offset(skip).limit(limit), False
+
+    after = decode_cursor(cursor) if cursor else None
+    posts_query = queries.select_posts(search, after)
+
+    if after is None:
+        posts_query = posts_query.offset(skip)
+
+    return posts_query.limit(limit), True
@@ -0,0 +1,94 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from .config import settings
+
+logger = logging.getLogger("app.requests")
+
+class RequestProfile:
+    # SQL statements and database time spent by one request, filled in by the engine hooks in app/database.py
+    def __init__(
+        self,
+        record_queries: bool = False
+    ):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.queries = [] if record_queries else None
+
+    def record(
+        self,
+        statement: str,
+        seconds: float
+    ):
+        self.statements += 1
+        self.db_seconds += seconds
+        if self.queries is not None:
+            self.queries.append((statement, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} statements", '
+            f"app;dur={self.elapsed() * 1000:.1f}"
+        )
+
+# Set for the duration of a request, sync routers see it too since the threadpool copies the context
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+class ProfilingMiddleware:
+    # Plain ASGI middleware, BaseHTTPMiddleware would add a task and a body copy to every request
+    def __init__(
+        self,
+        app
+    ):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(record_queries=settings.slow_request_ms is not None)
+        token = current_profile.set(profile)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing_header:
+                    MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            log_request(scope, status_code, profile)
+
+def log_request(
+    scope,
+    status_code: int,
+    profile: RequestProfile
+):
+    duration_ms = profile.elapsed() * 1000
+    fields = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status_code,
+        "duration_ms": round(duration_ms, 1),
+        "db_statements": profile.statements,
+        "db_ms": round(profile.db_seconds * 1000, 1)
+    }
+    logger.info(" ".join(f"{key}={value}" for key, value in fields.items()), extra={"request": fields})
+
+    if profile.queries is not None and duration_ms >= settings.slow_request_ms:
+        for statement, seconds in profile.queries:
+            logger.warning(
+                "slow request method=%s path=%s query_ms=%.1f statement=%s",
+                scope["method"], scope["path"], seconds * 1000, " ".join(statement.split())
+            )
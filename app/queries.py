@@ -0,0 +1,286 @@
+"""
+# Statements shared by the sync (app/routers) and async (app/routers/aio) routers
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, and_, column, delete, func, literal, or_, select, tuple_, union, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
+from . import models, schemas
+
+# PostOut serializes Post.owner: joining it in keeps a page at one statement instead of one per post,
+# and AsyncSession could not lazy load it at all. owner_id is NOT NULL, so an inner join is safe.
+load_owner = joinedload(models.Post.owner, innerjoin=True)
+
+def select_posts(
+    search: Optional[str] = "", 
+    after: Optional[tuple[datetime, int]] = None
+):
+    # Newest first, id breaks ties between posts created in the same transaction
+    posts_query = select(models.Post, models.Post.vote_count.label("Votes")).where(
+        models.Post.title.contains(search)
+    ).options(
+        load_owner
+    ).order_by(
+        models.Post.created_at.desc(), models.Post.id.desc()
+    )
+
+    if after is not None:
+        # Keyset pagination: seek past the (created_at, id) of the previous page's last row
+        posts_query = posts_query.where(tuple_(models.Post.created_at, models.Post.id) < after)
+
+    return posts_query
+
+def search_posts(
+    search: str
+):
+    # Full-text matches ranked by ts_rank, plus a trigram-indexed substring fallback on
+    # the title for partial words that produce no lexeme match (those rank last)
+    ts_query = func.websearch_to_tsquery("english", search)
+    rank = func.ts_rank(models.Post.search_vector, ts_query)
+
+    return select(models.Post, models.Post.vote_count.label("Votes")).where(
+        or_(
+            models.Post.search_vector.op("@@")(ts_query),
+            models.Post.title.icontains(search, autoescape=True)
+        )
+    ).options(
+        load_owner
+    ).order_by(
+        rank.desc(), models.Post.id.desc()
+    )
+
+# Reddit-style hot score: log10 of the votes plus the post's age in units of HOT_SECONDS, so a post
+# needs 10x the votes to outrank one posted 12.5 hours later. It is anchored to a fixed epoch rather
+# than now(): scores never decay, and only posts that got votes need recomputing.
+HOT_EPOCH = 1134028003
+HOT_SECONDS = 45000
+
+def hot_score(
+    vote_count, 
+    created_at
+):
+    return func.log(func.greatest(vote_count, 1)) + (func.extract("epoch", created_at) - HOT_EPOCH) / HOT_SECONDS
+
+def refresh_post_scores(
+    since: Optional[datetime] = None
+):
+    # Upserts the score of every post voted on or created since `since`, of all posts when None
+    scores = select(
+        models.Post.id, hot_score(models.Post.vote_count, models.Post.created_at), func.now()
+    )
+
+    if since is not None:
+        changed = union(
+            select(models.Vote.post_id).where(models.Vote.created_at >= since),
+            select(models.Post.id).where(models.Post.created_at >= since)
+        )
+        scores = scores.where(models.Post.id.in_(changed))
+
+    upsert = insert(models.PostScore).from_select(["post_id", "score", "updated_at"], scores)
+    return upsert.on_conflict_do_update(
+        index_elements=[models.PostScore.post_id], 
+        set_={"score": upsert.excluded.score, "updated_at": upsert.excluded.updated_at}
+    )
+
+def select_trending():
+    return select(models.Post, models.Post.vote_count.label("Votes")).join(
+        models.PostScore, models.PostScore.post_id == models.Post.id
+    ).options(
+        load_owner
+    ).order_by(
+        models.PostScore.score.desc(), models.PostScore.post_id.desc()
+    )
+
+def select_export(
+    created_after: Optional[datetime] = None, 
+    created_before: Optional[datetime] = None, 
+    owner_id: Optional[int] = None
+):
+    # Plain columns rather than entities: rows go straight to the encoder, nothing is tracked by the session.
+    # Oldest first on (created_at, id), the order of ix_posts_created_at_id, so a date range is an index range.
+    export_query = select(
+        models.Post.id, 
+        models.Post.title, 
+        models.Post.content, 
+        models.Post.published, 
+        models.Post.created_at, 
+        models.Post.owner_id, 
+        models.Post.vote_count.label("votes")
+    ).order_by(
+        models.Post.created_at, models.Post.id
+    )
+
+    if created_after is not None:
+        export_query = export_query.where(models.Post.created_at >= created_after)
+    if created_before is not None:
+        export_query = export_query.where(models.Post.created_at < created_before)
+    if owner_id is not None:
+        export_query = export_query.where(models.Post.owner_id == owner_id)
+
+    return export_query
+
+def select_post(
+    id: int
+):
+    return select(models.Post, models.Post.vote_count.label("Votes")).where(models.Post.id == id).options(load_owner)
+
+def apply_vote(
+    user_id: int, 
+    vote: schemas.Vote
+):
+    # One round trip per vote: the post lookup, the ownership check, the vote write and the
+    # counter update all run as CTEs of a single statement. It returns the post's owner_id
+    # (NULL when the post does not exist) and how many votes were actually written.
+    target = select(models.Post.id, models.Post.owner_id).where(models.Post.id == vote.post_id).cte("target")
+
+    if vote.dir == schemas.VoteDir.UPVOTE:
+        # ON CONFLICT DO NOTHING turns concurrent double taps into a 409 instead of an IntegrityError
+        changed = insert(models.Vote).from_select(
+            ["user_id", "post_id"], 
+            select(literal(user_id, Integer), target.c.id).where(target.c.owner_id != user_id)
+        ).on_conflict_do_nothing().returning(models.Vote.post_id).cte("changed")
+        delta = 1
+    else:
+        changed = delete(models.Vote).where(
+            models.Vote.post_id == target.c.id, 
+            models.Vote.user_id == user_id, 
+            target.c.owner_id != user_id
+        ).returning(models.Vote.post_id).cte("changed")
+        delta = -1
+
+    counted = update(models.Post).where(models.Post.id == changed.c.post_id).values(
+        vote_count=models.Post.vote_count + delta
+    ).returning(models.Post.id, models.Post.owner_id).cte("counted")
+
+    # The post owner's votes_received moves with the post's vote_count, in the same statement
+    received = update(models.UserStats).where(models.UserStats.user_id == counted.c.owner_id).values(
+        votes_received=models.UserStats.votes_received + delta
+    ).cte("received")
+
+    return select(
+        select(target.c.owner_id).scalar_subquery().label("owner_id"),
+        select(func.count()).select_from(counted).scalar_subquery().label("changed")
+    ).add_cte(received)
+
+def change_vote_counts(
+    deltas: dict[int, int]
+):
+    # One UPDATE ... FROM (VALUES ...) for every post touched by a batch of votes. Rows go in post_id
+    # order, like insert_votes, so concurrent batches lock the hot posts in the same order.
+    changes = values(
+        column("post_id", Integer), column("delta", Integer), name="changes"
+    ).data(sorted(deltas.items()))
+
+    return update(models.Post).where(models.Post.id == changes.c.post_id).values(
+        vote_count=models.Post.vote_count + changes.c.delta
+    )
+
+def change_votes_received(
+    deltas: dict[int, int]
+):
+    # votes_received per post owner, for the vote counts changed by change_vote_counts, in user_id order
+    changes = values(
+        column("user_id", Integer), column("delta", Integer), name="changes"
+    ).data(sorted(deltas.items()))
+
+    return update(models.UserStats).where(models.UserStats.user_id == changes.c.user_id).values(
+        votes_received=models.UserStats.votes_received + changes.c.delta
+    )
+
+def count_new_posts(
+    owner_id: int, 
+    posts: int = 1
+):
+    # The user's first post creates their user_stats row
+    upsert = insert(models.UserStats).values(user_id=owner_id, post_count=posts, votes_received=0)
+    return upsert.on_conflict_do_update(
+        index_elements=[models.UserStats.user_id], 
+        set_={"post_count": models.UserStats.post_count + upsert.excluded.post_count}
+    )
+
+def insert_posts():
+    # Executed with a list of rows: insertmanyvalues batches them into multi-row VALUES,
+    # and sort_by_parameter_order returns the ids in the order of the rows
+    return insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True)
+
+def reserve_post_ids(
+    count: int
+):
+    # Ids for rows written with COPY, which cannot return them
+    return select(func.nextval(func.pg_get_serial_sequence("posts", "id"))).select_from(func.generate_series(1, count))
+
+def delete_post(
+    id: int
+):
+    # Returns how many posts were deleted (0 or 1). The owner's stats lose the post and
+    # its votes in the same statement.
+    deleted = delete(models.Post).where(models.Post.id == id).returning(
+        models.Post.owner_id, models.Post.vote_count
+    ).cte("deleted")
+
+    uncounted = update(models.UserStats).where(models.UserStats.user_id == deleted.c.owner_id).values(
+        post_count=models.UserStats.post_count - 1, 
+        votes_received=models.UserStats.votes_received - deleted.c.vote_count
+    ).cte("uncounted")
+
+    return select(select(func.count()).select_from(deleted).scalar_subquery()).add_cte(uncounted)
+
+def select_user_stats(
+    id: int
+):
+    # A user without a user_stats row has not posted yet, None when the user does not exist
+    return select(
+        models.User.id.label("user_id"), 
+        func.coalesce(models.UserStats.post_count, 0).label("post_count"), 
+        func.coalesce(models.UserStats.votes_received, 0).label("votes_received")
+    ).outerjoin(
+        models.UserStats, models.UserStats.user_id == models.User.id
+    ).where(models.User.id == id)
+
+def rebuild_user_stats():
+    # Recounts every user from posts and votes in one statement, see app/maintenance.py
+    totals = select(
+        models.User.id, 
+        func.count(func.distinct(models.Post.id)), 
+        func.count(models.Vote.post_id)
+    ).outerjoin(
+        models.Post, models.Post.owner_id == models.User.id
+    ).outerjoin(
+        models.Vote, models.Vote.post_id == models.Post.id
+    ).group_by(models.User.id)
+
+    upsert = insert(models.UserStats).from_select(["user_id", "post_count", "votes_received"], totals)
+    return upsert.on_conflict_do_update(
+        index_elements=[models.UserStats.user_id], 
+        set_={"post_count": upsert.excluded.post_count, "votes_received": upsert.excluded.votes_received}
+    )
+
+def select_post_owners(
+    pairs: list[tuple[int, int]]
+):
+    # (post_id, owner_id, user_id) for the posts of the (user_id, post_id) pairs, user_id is the voter
+    # of each pair that already has a vote and NULL for a post none of them has voted on yet
+    return select(models.Post.id, models.Post.owner_id, models.Vote.user_id).outerjoin(
+        models.Vote, 
+        and_(
+            models.Vote.post_id == models.Post.id, 
+            tuple_(models.Vote.user_id, models.Vote.post_id).in_(pairs)
+        )
+    ).where(models.Post.id.in_({post_id for _, post_id in pairs}))
+
+def insert_votes(
+    pairs: list[tuple[int, int]]
+):
+    # (user_id, post_id) pairs, only the rows that did not exist yet are returned. Rows go in
+    # post_id order so concurrent batches take their locks in the same order.
+    return insert(models.Vote).values(
+        [{"user_id": user_id, "post_id": post_id} for user_id, post_id in sorted(pairs, key=lambda pair: (pair[1], pair[0]))]
+    ).on_conflict_do_nothing().returning(models.Vote.user_id, models.Vote.post_id)
+
+def delete_votes(
+    pairs: list[tuple[int, int]]
+):
+    return delete(models.Vote).where(
+        tuple_(models.Vote.user_id, models.Vote.post_id).in_(sorted(pairs, key=lambda pair: (pair[1], pair[0])))
+    ).returning(models.Vote.user_id, models.Vote.post_id)
@@ -0,0 +1,211 @@
+"""
+# Read replicas
+
+Read-only handlers take their session from get_read_db / get_async_read_db instead of
+get_db / get_async_db. With DATABASE_REPLICA_URLS set these sessions are bound to a
+replica chosen round-robin. A replica that fails to connect is skipped for
+database_replica_retry_seconds, and when none is reachable reads fall back to the primary.
+
+Replicas lag behind the primary, so a user who just wrote is pinned to the primary for
+read_your_writes_seconds (see pin_writes). Other users may still read a stale row from a
+replica, so handlers only fill shared caches from primary reads (see on_replica). Without
+replica URLs every read goes to the primary.
+"""
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from . import oauth2
+from .cache import make_cache
+from .config import settings
+from .database import (
+    AsyncSessionLocal, InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, SessionLocal,
+    instrument_engine, pool_options
+)
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines: list,
+        retry_after: float
+    ):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._turn = itertools.count()
+        self._down_until = {}
+
+    def candidates(self):
+        # Healthy replicas, starting from the next one in round-robin order
+        if not self.engines:
+            return []
+        start = next(self._turn) % len(self.engines)
+        now = time.monotonic()
+        ordered = self.engines[start:] + self.engines[:start]
+        return [engine for engine in ordered if self._down_until.get(engine, 0) <= now]
+
+    def mark_down(
+        self,
+        engine
+    ):
+        self._down_until[engine] = time.monotonic() + self.retry_after
+
+    def mark_up(
+        self,
+        engine
+    ):
+        self._down_until.pop(engine, None)
+
+    def connect(self):
+        # A checkout is the health check: pre_ping validates pooled connections, new ones must connect
+        for engine in self.candidates():
+            try:
+                connection = engine.connect()
+            except exc.DBAPIError:
+                self.mark_down(engine)
+                continue
+            self.mark_up(engine)
+            return connection
+        return None
+
+    async def connect_async(self):
+        for engine in self.candidates():
+            try:
+                connection = await engine.connect()
+            except (exc.DBAPIError, OSError):
+                self.mark_down(engine)
+                continue
+            self.mark_up(engine)
+            return connection
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {"url": engine.url.render_as_string(hide_password=True), "healthy": self._down_until.get(engine, 0) <= now}
+            for engine in self.engines
+        ]
+
+def replica_options(
+    poolclass: type
+):
+    return {**pool_options(poolclass), "pool_pre_ping": True}
+
+def _sync_engine(
+    url: str
+):
+    engine = create_engine(url, **replica_options(InstrumentedQueuePool))
+    instrument_engine(engine)
+    return engine
+
+def _async_engine(
+    url: str
+):
+    engine = create_async_engine(
+        url.replace("+psycopg2", "+asyncpg", 1), **replica_options(InstrumentedAsyncAdaptedQueuePool)
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+replicas = ReplicaSet(
+    [_sync_engine(url) for url in settings.database_replica_urls],
+    settings.database_replica_retry_seconds
+)
+
+# Only built in async mode, like database.async_engine
+async_replicas = ReplicaSet(
+    [_async_engine(url) for url in settings.database_replica_urls] if settings.database_async else [],
+    settings.database_replica_retry_seconds
+)
+
+# User ids that wrote within the read-your-writes window, shared between workers with the redis backend
+pinned_users = make_cache("pinned", settings.read_your_writes_cache_size, settings.read_your_writes_seconds)
+
+def pin_writes(
+    request: Request,
+    current_user = Depends(oauth2.get_current_user)
+):
+    # Router dependency for routers that write: any non-GET request pins its user to the primary
+    if request.method not in ("GET", "HEAD") and replicas.engines:
+        pinned_users.set(current_user.id, 1)
+
+def _reads_from_primary(
+    request: Request
+):
+    authorization = request.headers.get("Authorization")
+    scheme, token = get_authorization_scheme_param(authorization)
+    if not authorization or scheme.lower() != "bearer":
+        return False
+    try:
+        user = oauth2.verify_access_token(token, HTTPException(status_code=status.HTTP_401_UNAUTHORIZED))
+    except HTTPException:
+        # The handler's own authentication rejects the request
+        return False
+    return pinned_users.get(user.id) is not None
+
+@contextmanager
+def read_session(
+    replica: bool = True
+):
+    # A replica session when one is reachable and wanted, a primary session otherwise
+    connection = replicas.connect() if replica and replicas.engines else None
+    db = SessionLocal(bind=connection, info={"replica": True}) if connection is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        if connection is not None:
+            connection.close()
+
+@asynccontextmanager
+async def async_read_session(
+    replica: bool = True
+):
+    connection = None
+    if replica and async_replicas.engines:
+        connection = await async_replicas.connect_async()
+
+    if connection is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    try:
+        async with AsyncSessionLocal(bind=connection, info={"replica": True}) as db:
+            yield db
+    finally:
+        await connection.close()
+
+def on_replica(
+    db
+):
+    # Rows read from a replica may be stale: they can be served, but must not be put in a shared cache
+    return db.info.get("replica", False)
+
+def get_read_db(
+    request: Request
+):
+    with read_session(bool(replicas.engines) and not _reads_from_primary(request)) as db:
+        yield db
+
+async def get_async_read_db(
+    request: Request
+):
+    async with async_read_session(bool(async_replicas.engines) and not _reads_from_primary(request)) as db:
+        yield db
+
+# Streamed responses outlive their dependencies, whose sessions are closed before the body is sent.
+# These hand the handler a session factory instead, to be opened while the body is produced.
+
+def get_read_sessions(
+    request: Request
+):
+    return partial(read_session, bool(replicas.engines) and not _reads_from_primary(request))
+
+def get_async_read_sessions(
+    request: Request
+):
+    return partial(async_read_session, bool(async_replicas.engines) and not _reads_from_primary(request))
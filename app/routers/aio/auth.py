@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas
+from app.database import get_async_db
+from app.utils import verify_async
+from app.oauth2 import create_access_token
+
+router = APIRouter(
+    tags=["auth"],
+)
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    user_credentials: OAuth2PasswordRequestForm = Depends(), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = (await db.execute(select(models.User).where(models.User.email == user_credentials.username))).scalar()
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail="User not found"
+        )
+
+    if not await verify_async(plain_password=user_credentials.password, hashed_password=user.password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="Invalid credentials"
+        )
+    
+    access_token = create_access_token(data={
+        "user_id": user.id
+        }
+    )
+
+    return {
+        "access_token": access_token, 
+        "token_type": "bearer"
+    }
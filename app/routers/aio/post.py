@@ -0,0 +1,237 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import bulk, conditional, export, lookups, models, schemas, oauth2, pagination, queries, serialization
+from ...cache import post_cache
+from ...database import get_async_db
+from ...replicas import get_async_read_db, get_async_read_sessions, on_replica, pin_writes
+
+# pin_writes keeps a user who just wrote on the primary, their next reads must not hit a lagging replica
+router = APIRouter(
+    prefix="/posts",
+    tags=["Posts"],
+    dependencies=[Depends(pin_writes)]
+)
+
+"""
+# Retrieve Posts
+"""
+@router.get("/", response_model=list[schemas.PostOut])
+async def get_posts(
+    request: Request, 
+    db: AsyncSession = Depends(get_async_read_db), 
+    current_user: int = Depends(oauth2.get_current_user), 
+    limit: int = 3, 
+    skip: int = 0, 
+    search: Optional[str] = "",
+    search_mode: schemas.SearchMode = schemas.SearchMode.SUBSTRING,
+    cursor: Optional[str] = None
+):
+
+    posts_query, keyset = pagination.posts_page(search, search_mode, cursor, skip, limit)
+    posts = (await db.execute(posts_query)).all()
+
+    headers = {}
+    next_cursor = pagination.next_cursor(posts, limit) if keyset else None
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    # The page's ETag comes from the rows alone, a match skips serializing them
+    etag = conditional.posts_etag(posts)
+    if conditional.matches(request, etag):
+        return conditional.not_modified(etag, headers)
+    headers["ETag"] = etag
+
+    # response_model only documents the shape, the rows are serialized by the fast path
+    return Response(content=serialization.dump_posts(posts), media_type="application/json", headers=headers)
+
+"""
+# Trending Posts
+"""
+# Declared before /{id}, which would otherwise match "trending"
+@router.get("/trending", response_model=list[schemas.PostOut])
+async def get_trending_posts(
+    db: AsyncSession = Depends(get_async_read_db), 
+    current_user: int = Depends(oauth2.get_current_user), 
+    limit: int = 10, 
+    skip: int = 0
+):
+
+    posts = (await db.execute(queries.select_trending().offset(skip).limit(limit))).all()
+    return Response(content=serialization.dump_posts(posts), media_type="application/json")
+
+"""
+# Export Posts
+"""
+@router.get("/export", response_class=StreamingResponse)
+async def export_posts(
+    request: Request, 
+    sessions = Depends(get_async_read_sessions), 
+    current_user: int = Depends(oauth2.get_current_user), 
+    created_after: Optional[datetime] = None, 
+    created_before: Optional[datetime] = None, 
+    owner_id: Optional[int] = None
+):
+    export_query = queries.select_export(created_after, created_before, owner_id)
+    gzip = export.wants_gzip(request)
+    return StreamingResponse(
+        export.stream_posts_async(sessions, export_query, gzip), 
+        media_type=export.NDJSON_MEDIA_TYPE, 
+        headers=export.headers(gzip)
+    )
+
+"""
+# Create Post
+"""
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.Post)
+async def create_post(
+    post: schemas.PostCreate, 
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.UserOut = Depends(lookups.get_current_user_record_async)
+):
+    new_post = models.Post(owner_id=current_user.id, **post.model_dump())
+    db.add(new_post)
+    await db.execute(queries.count_new_posts(current_user.id))
+    await db.commit() # Server defaults come back with the INSERT
+    lookups.remember_post_owner(new_post.id, current_user.id)
+    # The owner is the current user, no need to load new_post.owner
+    return {**serialization.post_fields(new_post), "owner": current_user}
+
+"""
+# Bulk Create Posts
+"""
+@router.post("/bulk", response_model=schemas.BulkPostsOut, openapi_extra=bulk.OPENAPI_REQUEST_BODY)
+async def bulk_create_posts(
+    request: Request, 
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.UserOut = Depends(lookups.get_current_user_record_async)
+):
+    async def write_chunk(posts, use_copy):
+        return await bulk.write_chunk_async(db, current_user.id, posts, use_copy)
+
+    return ORJSONResponse(await bulk.import_posts(request, write_chunk))
+
+"""
+# Get Post
+"""
+@router.get("/{id}", response_model=schemas.PostOut)
+async def get_post(
+    id: int, 
+    request: Request, 
+    db: AsyncSession = Depends(get_async_read_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+
+    cached_post = post_cache.get(id)
+    if cached_post is not None:
+        etag, body = conditional.unpack(cached_post)
+        if etag is None:
+            return Response(content=body, media_type="application/json")
+        if conditional.matches(request, etag):
+            return conditional.not_modified(etag)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    post = (await db.execute(queries.select_post(id))).first()
+
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    lookups.remember_post_owner(id, post.Post.owner_id)
+    etag = conditional.post_etag(post)
+    if conditional.matches(request, etag):
+        return conditional.not_modified(etag)
+
+    # Cache the serialized body, hits skip both the query and the response_model validation. Only
+    # from the primary: a lagging replica would put back a post an update just evicted.
+    body = serialization.dump_post(post)
+    if not on_replica(db):
+        post_cache.set(id, conditional.pack(etag, body))
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+"""
+# Delete Post
+"""
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_post(
+    id: int, 
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    owner_id = await lookups.post_owner_async(db, id)
+
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    if owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not authorized to perform requested action."
+        )
+
+    # Also takes the post and its votes off the owner's user_stats
+    deleted = await db.scalar(queries.delete_post(id))
+    await db.commit()
+    lookups.invalidate_post(id)
+
+    if not deleted:
+        # Deleted since its owner was cached
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+"""
+# Update Post
+"""
+@router.put("/{id}", status_code=status.HTTP_200_OK, response_model=schemas.Post)
+async def update_post(
+    id: int, 
+    updated_post: schemas.PostCreate, 
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    owner_id = await lookups.post_owner_async(db, id)
+
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    if owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not authorized to perform requested action."
+        )
+
+    updated = (await db.execute(
+        # A new version changes the post's ETag
+        update(models.Post).where(models.Post.id == id).values(**updated_post.model_dump(), version=models.Post.version + 1)
+    )).rowcount
+    await db.commit()
+
+    if not updated:
+        # Deleted since its owner was cached
+        lookups.invalidate_post(id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    post_cache.delete(id)
+
+    # populate_existing overwrites the stale instance already in the identity map
+    return (await db.execute(
+        select(models.Post).where(models.Post.id == id).options(queries.load_owner).execution_options(populate_existing=True)
+    )).scalar_one()
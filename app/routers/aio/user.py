@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import lookups, models, queries, schemas, utils
+from ...database import get_async_db
+from ...replicas import get_async_read_db
+
+router = APIRouter(
+    prefix="/users",
+    tags=["Users"]
+)
+
+"""
+# Create User
+"""
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
+async def create_user(
+    user: schemas.UserCreate, 
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_mail = (await db.execute(select(models.User).where(models.User.email == user.email))).scalar()
+    if user_mail:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail=f"Email {user.email} is already registered."
+        )
+
+    user.password = await utils.hash_async(user.password)
+
+    new_user = models.User(**user.model_dump())
+
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+"""
+# Get User
+"""
+@router.get("/{id}", response_model=schemas.UserOut)
+async def get_user(
+    id: int, 
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    body = await lookups.user_body_async(db, id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"user with id: {id} was not found."
+        )
+    # Served from the user cache when possible, see app/lookups.py
+    return Response(content=body, media_type="application/json")
+
+
+"""
+# User Stats
+"""
+@router.get("/{id}/stats", response_model=schemas.UserStats)
+async def get_user_stats(
+    id: int, 
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    stats = (await db.execute(queries.select_user_stats(id))).first()
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"user with id: {id} was not found."
+        )
+    return stats
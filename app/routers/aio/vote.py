@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import database, lookups, schemas, oauth2, queries
+from ...cache import post_cache
+from ...config import settings
+from ...replicas import pin_writes
+from ...vote_queue import enqueue
+from ...voting import VoteBatch
+
+router = APIRouter(
+    prefix="/vote",
+    tags=["Votes"],
+    dependencies=[Depends(pin_writes)]
+)
+
+"""
+# Vote
+"""
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def vote(
+    vote: schemas.Vote, 
+    db: AsyncSession = Depends(database.get_async_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    # A cached owner answers the 403 without a round trip, apply_vote checks it again anyway
+    if lookups.cached_post_owner(vote.post_id) == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You cannot vote on your own post"
+        )
+
+    if settings.vote_write_behind:
+        # Answers 202 before anything is written, see app/vote_queue.py
+        return enqueue(current_user.id, vote)
+
+    owner_id, changed = (await db.execute(queries.apply_vote(current_user.id, vote))).one()
+
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"Post wiht id: {vote.post_id} does not exits"
+        )
+
+    lookups.remember_post_owner(vote.post_id, owner_id)
+
+    if owner_id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You cannot vote on your own post"
+        )
+    
+    if vote.dir == 1:
+        if not changed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, 
+                detail=f"user with {current_user.id} has already voted on post {vote.post_id}"
+            )
+
+        await db.commit()
+        post_cache.delete(vote.post_id)
+        return {
+            "message": "successfully added vote"
+        }
+
+    else:
+        if not changed:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail="Vote does not exits"
+            )
+
+        await db.commit()
+        post_cache.delete(vote.post_id)
+        
+        return {
+            "message": "successfully deleted vote"
+        }
+
+"""
+# Batch Vote
+"""
+@router.post("/batch", response_model=list[schemas.VoteResult])
+async def vote_batch(
+    votes: list[schemas.Vote], 
+    db: AsyncSession = Depends(database.get_async_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    if len(votes) > settings.vote_batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, 
+            detail=f"A batch can hold at most {settings.vote_batch_max_size} votes"
+        )
+
+    # Each vote gets the status code POST /vote/ would have returned for it
+    batch = VoteBatch([(current_user.id, vote) for vote in votes])
+    results = await batch.apply_async(db)
+    await db.commit()
+
+    for post_id in batch.changed_posts:
+        post_cache.delete(post_id)
+
+    return results
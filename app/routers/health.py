@@ -0,0 +1,32 @@
+from fastapi import APIRouter, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import exc
+from .. import warmup
+
+# Probes for orchestrators, kept out of the public OpenAPI schema
+router = APIRouter(
+    tags=["Health"],
+    include_in_schema=False
+)
+
+"""
+# Liveness
+"""
+@router.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+"""
+# Readiness
+"""
+@router.get("/readyz")
+async def readyz():
+    if not warmup.state.warmed_up:
+        return ORJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "warming up"})
+
+    try:
+        await warmup.ping_database()
+    except (exc.DBAPIError, OSError):
+        return ORJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "database unavailable"})
+
+    return {"status": "ready", "warmup": warmup.state.timings}
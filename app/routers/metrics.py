@@ -0,0 +1,70 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from .. import database, oauth2, replicas
+from ..cache import post_cache, post_owner_cache, user_cache
+from ..config import settings
+from ..vote_queue import vote_queue
+
+def require_metrics_token(
+    x_metrics_token: Optional[str] = Header(None)
+):
+    # Pool, cache and replica internals are for operators only. Without METRICS_TOKEN the
+    # endpoints do not exist, a missing or wrong token gets the same 404.
+    token = settings.metrics_token
+    if not token or x_metrics_token is None or not secrets.compare_digest(x_metrics_token, token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+# Internal endpoints, kept out of the public OpenAPI schema and behind METRICS_TOKEN
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)]
+)
+
+"""
+# Database Pool
+"""
+@router.get("/db-pool")
+def db_pool():
+    # In async mode the read-only routes go through the async replicas, the sync ones stay unused
+    if settings.database_async:
+        replica_set = replicas.async_replicas
+        replica_pools = [database.pool_stats(engine.sync_engine) for engine in replica_set.engines]
+    else:
+        replica_set = replicas.replicas
+        replica_pools = [database.pool_stats(engine) for engine in replica_set.engines]
+
+    return {
+        "sync": database.pool_stats(database.engine),
+        "async": database.pool_stats(database.async_engine.sync_engine) if database.async_engine else None,
+        "replicas": [
+            {**replica, **pool} for replica, pool in zip(replica_set.stats(), replica_pools)
+        ]
+    }
+
+"""
+# Token Cache
+"""
+@router.get("/token-cache")
+def token_cache():
+    return oauth2.token_cache.stats()
+
+"""
+# Response Caches
+"""
+@router.get("/cache")
+def cache():
+    return {
+        "posts": post_cache.stats(),
+        "users": user_cache.stats(),
+        "post_owners": post_owner_cache.stats()
+    }
+
+"""
+# Vote Queue
+"""
+@router.get("/vote-queue")
+def vote_queue_stats():
+    return vote_queue.stats()
@@ -1,13 +1,19 @@
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from .. import models, schemas, oauth2
+from .. import bulk, conditional, export, lookups, models, schemas, oauth2, pagination, queries, serialization
+from ..cache import post_cache
 from ..database import get_db
-from sqlalchemy import func
+from ..replicas import get_read_db, get_read_sessions, on_replica, pin_writes
 
+# pin_writes keeps a user who just wrote on the primary, their next reads must not hit a lagging replica
 router = APIRouter(
     prefix="/posts",
-    tags=["Posts"]
+    tags=["Posts"],
+    dependencies=[Depends(pin_writes)]
 )
 
 """
@@ -15,18 +21,68 @@ router = APIRouter(
 """
 @router.get("/", response_model=list[schemas.PostOut])
 def get_posts(
-    db: Session = Depends(get_db), 
+    request: Request, 
+    db: Session = Depends(get_read_db), 
     current_user: int = Depends(oauth2.get_current_user), 
     limit: int = 3, 
     skip: int = 0, 
-    search: Optional[str] = ""
+    search: Optional[str] = "",
+    search_mode: schemas.SearchMode = schemas.SearchMode.SUBSTRING,
+    cursor: Optional[str] = None
+):
+
+    posts_query, keyset = pagination.posts_page(search, search_mode, cursor, skip, limit)
+    posts = db.execute(posts_query).all()
+
+    headers = {}
+    next_cursor = pagination.next_cursor(posts, limit) if keyset else None
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    # The page's ETag comes from the rows alone, a match skips serializing them
+    etag = conditional.posts_etag(posts)
+    if conditional.matches(request, etag):
+        return conditional.not_modified(etag, headers)
+    headers["ETag"] = etag
+
+    # response_model only documents the shape, the rows are serialized by the fast path
+    return Response(content=serialization.dump_posts(posts), media_type="application/json", headers=headers)
+
+"""
+# Trending Posts
+"""
+# Declared before /{id}, which would otherwise match "trending"
+@router.get("/trending", response_model=list[schemas.PostOut])
+def get_trending_posts(
+    db: Session = Depends(get_read_db), 
+    current_user: int = Depends(oauth2.get_current_user), 
+    limit: int = 10, 
+    skip: int = 0
 ):
 
-    posts = db.query(models.Post, func.count(models.Vote.post_id).label("Votes")).join(
-        models.Vote, models.Vote.post_id == models.Post.id, isouter=True
-    ).group_by(models.Post.id).filter(models.Post.title.contains(search)).limit(limit).offset(skip).all()
+    posts = db.execute(queries.select_trending().offset(skip).limit(limit)).all()
+    return Response(content=serialization.dump_posts(posts), media_type="application/json")
 
-    return posts
+"""
+# Export Posts
+"""
+@router.get("/export", response_class=StreamingResponse)
+def export_posts(
+    request: Request, 
+    sessions = Depends(get_read_sessions), 
+    current_user: int = Depends(oauth2.get_current_user), 
+    created_after: Optional[datetime] = None, 
+    created_before: Optional[datetime] = None, 
+    owner_id: Optional[int] = None
+):
+    # NDJSON, one post per line, read through a server-side cursor (see app/export.py)
+    export_query = queries.select_export(created_after, created_before, owner_id)
+    gzip = export.wants_gzip(request)
+    return StreamingResponse(
+        export.stream_posts(sessions, export_query, gzip), 
+        media_type=export.NDJSON_MEDIA_TYPE, 
+        headers=export.headers(gzip)
+    )
 
 """
 # Create Post
@@ -35,14 +91,33 @@ def get_posts(
 def create_post(
     post: schemas.PostCreate, 
     db: Session = Depends(get_db), 
-    current_user: int = Depends(oauth2.get_current_user)
+    current_user: schemas.UserOut = Depends(lookups.get_current_user_record)
 ):
-    # current_user is extracted from the token and passed to this function
+    # current_user is resolved from the token through the user cache
     new_post = models.Post(owner_id=current_user.id, **post.model_dump())
     db.add(new_post) # Add new post to the session
+    db.execute(queries.count_new_posts(current_user.id)) # Count it in the owner's user_stats
     db.commit() # Commit the session to the database
     db.refresh(new_post) # Refresh the instance to get the new data from the database
-    return new_post
+    lookups.remember_post_owner(new_post.id, current_user.id)
+    # The owner is the current user, no need to load new_post.owner
+    return {**serialization.post_fields(new_post), "owner": current_user}
+
+"""
+# Bulk Create Posts
+"""
+@router.post("/bulk", response_model=schemas.BulkPostsOut, openapi_extra=bulk.OPENAPI_REQUEST_BODY)
+async def bulk_create_posts(
+    request: Request, 
+    db: Session = Depends(get_db), 
+    current_user: schemas.UserOut = Depends(lookups.get_current_user_record)
+):
+    # async so an NDJSON body can be read while it streams in, the chunks are written from the threadpool
+    async def write_chunk(posts, use_copy):
+        return await run_in_threadpool(bulk.write_chunk, db, current_user.id, posts, use_copy)
+
+    # response_model only documents the shape, validating a result per post would dominate large imports
+    return ORJSONResponse(await bulk.import_posts(request, write_chunk))
 
 """
 # Get Post
@@ -50,13 +125,21 @@ def create_post(
 @router.get("/{id}", response_model=schemas.PostOut)
 def get_post(
     id: int, 
-    db: Session = Depends(get_db), 
+    request: Request, 
+    db: Session = Depends(get_read_db), 
     current_user: int = Depends(oauth2.get_current_user)
 ):
 
-    post = db.query(models.Post, func.count(models.Vote.post_id).label("Votes")).join(
-        models.Vote, models.Vote.post_id == models.Post.id, isouter=True
-    ).group_by(models.Post.id).filter(models.Post.id == id).first()
+    cached_post = post_cache.get(id)
+    if cached_post is not None:
+        etag, body = conditional.unpack(cached_post)
+        if etag is None:
+            return Response(content=body, media_type="application/json")
+        if conditional.matches(request, etag):
+            return conditional.not_modified(etag)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    post = db.execute(queries.select_post(id)).first()
 
     if not post:
         raise HTTPException(
@@ -64,7 +147,17 @@ def get_post(
             detail=f"post with id: {id} was not found."
         )
 
-    return post
+    lookups.remember_post_owner(id, post.Post.owner_id)
+    etag = conditional.post_etag(post)
+    if conditional.matches(request, etag):
+        return conditional.not_modified(etag)
+
+    # Cache the serialized body, hits skip both the query and the response_model validation. Only
+    # from the primary: a lagging replica would put back a post an update just evicted.
+    body = serialization.dump_post(post)
+    if not on_replica(db):
+        post_cache.set(id, conditional.pack(etag, body))
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 """
 # Delete Post
@@ -75,23 +168,32 @@ def delete_post(
     db: Session = Depends(get_db), 
     current_user: int = Depends(oauth2.get_current_user)
 ):
-    post_query = db.query(models.Post).filter(models.Post.id == id)
-    post = post_query.first()
+    owner_id = lookups.post_owner(db, id)
 
-    if post is None:
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"post with id: {id} was not found."
         )
 
-    if post.owner_id != current_user.id:
+    if owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Not authorized to perform requested action."
         )
 
-    post_query.delete(synchronize_session=False)
+    # Also takes the post and its votes off the owner's user_stats
+    deleted = db.scalar(queries.delete_post(id))
     db.commit()
+    lookups.invalidate_post(id)
+
+    if not deleted:
+        # Deleted since its owner was cached
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 """
@@ -104,21 +206,34 @@ def update_post(
     db: Session = Depends(get_db), 
     current_user: int = Depends(oauth2.get_current_user)
 ):
-    post_query = db.query(models.Post).filter(models.Post.id == id)
-    post = post_query.first()
+    owner_id = lookups.post_owner(db, id)
 
-    if post is None:
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"post with id: {id} was not found."
         )
 
-    if post.owner_id != current_user.id:
+    if owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Not authorized to perform requested action."
         )
 
-    post_query.update(updated_post.model_dump(), synchronize_session=False)
+    post_query = db.query(models.Post).filter(models.Post.id == id)
+    # A new version changes the post's ETag
+    updated = post_query.update(
+        {**updated_post.model_dump(), "version": models.Post.version + 1}, synchronize_session=False
+    )
     db.commit()
-    return post_query.first()
\ No newline at end of file
+
+    if not updated:
+        # Deleted since its owner was cached
+        lookups.invalidate_post(id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"post with id: {id} was not found."
+        )
+
+    post_cache.delete(id)
+    return post_query.options(queries.load_owner).first()
\ No newline at end of file
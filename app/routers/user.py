@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils
+from .. import lookups, models, queries, schemas, utils
 from ..database import get_db
+from ..replicas import get_read_db
 
 router = APIRouter(
     prefix="/users",
@@ -40,12 +41,30 @@ def create_user(
 @router.get("/{id}", response_model=schemas.UserOut)
 def get_user(
     id: int, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
+):
+    body = lookups.user_body(db, id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail=f"user with id: {id} was not found."
+        )
+    # Served from the user cache when possible, see app/lookups.py
+    return Response(content=body, media_type="application/json")
+
+"""
+# User Stats
+"""
+@router.get("/{id}/stats", response_model=schemas.UserStats)
+def get_user_stats(
+    id: int, 
+    db: Session = Depends(get_read_db)
 ):
-    user = db.query(models.User).filter(models.User.id == id).first()
-    if not user:
+    # One primary key lookup in user_stats, maintained by the post and vote routers
+    stats = db.execute(queries.select_user_stats(id)).first()
+    if stats is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"user with id: {id} was not found."
         )
-    return user
\ No newline at end of file
+    return stats
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from .. import database, schemas, oauth2, models
+from .. import database, lookups, schemas, oauth2, queries
+from ..cache import post_cache
+from ..config import settings
+from ..replicas import pin_writes
+from ..vote_queue import enqueue
+from ..voting import VoteBatch
 
 router = APIRouter(
     prefix="/vote",
-    tags=["Votes"]
+    tags=["Votes"],
+    dependencies=[Depends(pin_writes)]
 )
 
 """
@@ -16,48 +22,81 @@ def vote(
     db: Session = Depends(database.get_db), 
     current_user: int = Depends(oauth2.get_current_user)
 ):
-    
-    # Check first if the post exist or not
-    post = db.query(models.Post).filter(models.Post.id == vote.post_id).first()
-    if not post:
+    # A cached owner answers the 403 without a round trip, apply_vote checks it again anyway
+    if lookups.cached_post_owner(vote.post_id) == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You cannot vote on your own post"
+        )
+
+    if settings.vote_write_behind:
+        # Answers 202 before anything is written, see app/vote_queue.py
+        return enqueue(current_user.id, vote)
+
+    owner_id, changed = (db.execute(queries.apply_vote(current_user.id, vote))).one()
+
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Post wiht id: {vote.post_id} does not exits"
         )
 
-    if post.owner_id == current_user.id:
+    lookups.remember_post_owner(vote.post_id, owner_id)
+
+    if owner_id == current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You cannot vote on your own post"
         )
-
-    vote_query = db.query(models.Vote).filter(models.Vote.post_id == vote.post_id, models.Vote.user_id == current_user.id)
-    found_vote = vote_query.first()
     
     if vote.dir == 1:
-        if found_vote:
+        if not changed:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, 
                 detail=f"user with {current_user.id} has already voted on post {vote.post_id}"
             )
 
-        new_vote = models.Vote(post_id= vote.post_id, user_id= current_user.id)
-        db.add(new_vote)
         db.commit()
+        post_cache.delete(vote.post_id)
         return {
             "message": "successfully added vote"
         }
 
     else:
-        if not found_vote:
+        if not changed:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Vote does not exits"
             )
 
-        vote_query.delete(synchronize_session=False)
         db.commit()
+        post_cache.delete(vote.post_id)
         
         return {
             "message": "successfully deleted vote"
-        }
\ No newline at end of file
+        }
+
+"""
+# Batch Vote
+"""
+@router.post("/batch", response_model=list[schemas.VoteResult])
+def vote_batch(
+    votes: list[schemas.Vote], 
+    db: Session = Depends(database.get_db), 
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    if len(votes) > settings.vote_batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, 
+            detail=f"A batch can hold at most {settings.vote_batch_max_size} votes"
+        )
+
+    # Each vote gets the status code POST /vote/ would have returned for it
+    batch = VoteBatch([(current_user.id, vote) for vote in votes])
+    results = batch.apply(db)
+    db.commit()
+
+    for post_id in batch.changed_posts:
+        post_cache.delete(post_id)
+
+    return results
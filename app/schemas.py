@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, conint
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, conint
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -7,14 +7,19 @@ class VoteDir(int, Enum):
     REMOVE = 0
     UPVOTE = 1
 
+class SearchMode(str, Enum):
+    SUBSTRING = "substring"
+    FULLTEXT = "fulltext"
+
 class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
-    email: EmailStr
+    # Validated as EmailStr on the way in, re-running email_validator for every
+    # serialized owner was most of the cost of a posts page
+    email: str = Field(json_schema_extra={"format": "email"})
     created_at: datetime
 
-    class Config:
-        orm_mode = True
-
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -32,20 +37,36 @@ class PostCreate(PostBase):
     pass
 
 class Post(PostBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
     owner_id: int
     owner: UserOut
-    
-    class Config:
-        orm_mode = True
 
 class PostOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     Post: Post
     Votes: int
 
-    class Config:
-        orm_mode = True
+class UserStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    user_id: int
+    post_count: int
+    votes_received: int
+
+class BulkPostResult(BaseModel):
+    # Position of the post in the request, and its id or why it was not created
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkPostsOut(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkPostResult]
 
 class Token(BaseModel):
     access_token: str
@@ -58,3 +79,9 @@ class TokenData(BaseModel):
 class Vote(BaseModel):
     post_id: int
     dir: VoteDir
+
+class VoteResult(BaseModel):
+    post_id: int
+    dir: VoteDir
+    status_code: int
+    detail: str
@@ -0,0 +1,63 @@
+"""
+# Fast JSON path for the post endpoints
+
+Rows are projected to plain dicts, then validated and encoded to bytes by pydantic-core
+through a prebuilt TypeAdapter. This skips response_model's attribute-by-attribute
+validation and the separate encoding pass. dump_json writes datetimes exactly as
+response_model does ("Z" for UTC), so these bodies match every other endpoint's.
+orjson, as the app's default ORJSONResponse, would write "+00:00".
+"""
+from pydantic import TypeAdapter
+from . import schemas
+
+post_out = TypeAdapter(schemas.PostOut)
+posts_out = TypeAdapter(list[schemas.PostOut])
+user_out = TypeAdapter(schemas.UserOut)
+
+def user_dict(
+    user
+):
+    return {"id": user.id, "email": user.email, "created_at": user.created_at}
+
+def post_fields(
+    post
+):
+    # schemas.Post without its owner
+    return {
+        "id": post.id,
+        "title": post.title,
+        "content": post.content,
+        "published": post.published,
+        "created_at": post.created_at,
+        "owner_id": post.owner_id
+    }
+
+def post_dict(
+    row
+):
+    # row is a (Post, Votes) row with Post.owner already loaded
+    return {
+        "Post": {**post_fields(row.Post), "owner": user_dict(row.Post.owner)},
+        "Votes": row.Votes
+    }
+
+def render(
+    adapter: TypeAdapter,
+    value
+):
+    return adapter.dump_json(adapter.validate_python(value))
+
+def dump_post(
+    row
+):
+    return render(post_out, post_dict(row))
+
+def dump_posts(
+    rows: list
+):
+    return render(posts_out, [post_dict(row) for row in rows])
+
+def dump_user(
+    user
+):
+    return render(user_out, user_dict(user))
@@ -0,0 +1,95 @@
+"""
+# Production server
+
+    python -m app.serve --host 0.0.0.0 --port 8000 --workers 16
+
+Runs uvicorn with one worker process per CPU (WEB_CONCURRENCY or --workers to override)
+on uvloop and httptools. Every worker opens its own connection pools, so the pool sizes
+handed to the workers are cut down until all of them together fit in
+DATABASE_MAX_CONNECTIONS. The password hashing pool is split between the workers the
+same way, instead of each of them starting one process per CPU.
+
+With more than one worker the parent process supervises them: a crashed worker is
+replaced, SIGHUP replaces every worker one at a time (a graceful reload, each old worker
+finishes its in-flight requests for up to GRACEFUL_TIMEOUT_SECONDS while the others keep
+serving), SIGTTIN and SIGTTOU add or remove a worker.
+"""
+import argparse
+import copy
+import os
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+from .config import settings
+
+def cpu_count():
+    # The CPUs this process may run on, which a container can restrict below os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def pool_limits(
+    workers: int
+):
+    # (pool_size, max_overflow) per engine so that every worker's pools together stay within the budget.
+    # In async mode a worker has the async engine and the sync one used by the background tasks.
+    engines = 2 if settings.database_async else 1
+    per_engine = settings.database_max_connections // (workers * engines)
+    if per_engine < 1:
+        raise SystemExit(
+            f"DATABASE_MAX_CONNECTIONS={settings.database_max_connections} cannot give {workers} worker(s) "
+            f"{engines} connection(s) each, lower the worker count or use DATABASE_NULL_POOL behind PgBouncer"
+        )
+
+    pool_size = min(settings.database_pool_size, per_engine)
+    return pool_size, min(settings.database_max_overflow, per_engine - pool_size)
+
+def worker_environment(
+    workers: int
+):
+    # Workers are spawned, not forked: they read their settings from the environment again
+    env = {}
+    if not settings.database_null_pool:
+        pool_size, max_overflow = pool_limits(workers)
+        env["DATABASE_POOL_SIZE"] = str(pool_size)
+        env["DATABASE_MAX_OVERFLOW"] = str(max_overflow)
+    if settings.password_hash_workers is None:
+        env["PASSWORD_HASH_WORKERS"] = str(max(1, cpu_count() // workers))
+    return env
+
+def log_config():
+    # uvicorn's logging setup plus an INFO handler for the app.* loggers: without one, the
+    # app.requests line ProfilingMiddleware writes per request only reaches Python's
+    # lastResort handler, which drops everything below WARNING
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["loggers"]["app"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
+    return config
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.serve")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to WEB_CONCURRENCY or one per CPU")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or settings.web_concurrency or cpu_count()
+    os.environ.update(worker_environment(workers))
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.keep_alive_seconds,
+        timeout_graceful_shutdown=settings.graceful_timeout_seconds,
+        log_config=log_config(),
+        # log_config routes ProfilingMiddleware's per-request app.requests line (with DB timings) to
+        # stderr, uvicorn's access log would log every request a second time
+        access_log=False
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+# Trending scores
+
+post_scores holds a precomputed hot score per post (see queries.hot_score) for
+GET /posts/trending. A background task started by the app's lifespan refreshes it
+every TRENDING_REFRESH_SECONDS, recomputing only posts created or voted on since the
+previous run. Removing a vote leaves no row to find, so the post keeps its slightly
+higher score until it is voted on again or the table is rebuilt with
+`python -m app.maintenance rebuild-scores`.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models, queries
+from .database import SessionLocal
+
+logger = logging.getLogger("app.trending")
+
+# A vote's created_at is its transaction's start time, it can commit after a refresh that started
+# later. Each run re-reads this much before the previous one, recomputing a score twice is harmless.
+OVERLAP = timedelta(seconds=60)
+
+# pg_try_advisory_xact_lock key, only one worker refreshes at a time
+REFRESH_LOCK = 0x7472656e64
+
+def refresh_scores(
+    db: Session,
+    since: Optional[datetime] = None
+):
+    refreshed = db.execute(queries.refresh_post_scores(since)).rowcount
+    db.commit()
+    return refreshed
+
+def refresh_once(
+    since: Optional[datetime]
+):
+    # Returns the `since` for the next run
+    with SessionLocal() as db:
+        started = db.scalar(select(func.now()))
+        if not db.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK))):
+            return since
+
+        if since is None:
+            # First run of this process: resume from the last refresh, rebuild everything on an empty table
+            since = db.scalar(select(func.max(models.PostScore.updated_at)))
+
+        refresh_scores(db, since - OVERLAP if since else None)
+        return started
+
+async def refresh_forever(
+    interval: float
+):
+    since = None
+    while True:
+        try:
+            since = await asyncio.to_thread(refresh_once, since)
+        except Exception:
+            logger.exception("trending refresh failed")
+        await asyncio.sleep(interval)
@@ -1,9 +1,82 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
+from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
-def hash(password: str):
+class PasswordHasherBusy(Exception):
+    # Raised instead of queueing once password_hash_queue_size calls are in flight
+    pass
+
+def _hash(password: str):
     return pwd_context.hash(password)
 
+def _verify(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+# bcrypt holds the GIL for the whole hash, so it runs in worker processes instead of threads
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.password_hash_queue_size)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers, 
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _executor
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+def hash(password: str):
+    if settings.password_hash_workers == 0:
+        return _hash(password)
+    return _submit(_hash, password).result()
+
 def verify(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    if settings.password_hash_workers == 0:
+        return _verify(plain_password, hashed_password)
+    return _submit(_verify, plain_password, hashed_password).result()
+
+async def hash_async(password: str):
+    if settings.password_hash_workers == 0:
+        return await run_in_threadpool(_hash, password)
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+async def verify_async(plain_password: str, hashed_password: str):
+    if settings.password_hash_workers == 0:
+        return await run_in_threadpool(_verify, plain_password, hashed_password)
+    return await asyncio.wrap_future(_submit(_verify, plain_password, hashed_password))
+
+async def warm_up():
+    # Starts every hashing process and loads bcrypt in it, ahead of the first login or sign-up
+    if settings.password_hash_workers == 0:
+        await run_in_threadpool(_hash, "warm-up")
+        return
+    processes = min(settings.password_hash_workers or os.cpu_count() or 1, settings.password_hash_queue_size)
+    await asyncio.gather(*(hash_async("warm-up") for _ in range(processes)))
+
+def shutdown():
+    # Called by the lifespan: the hashing processes would outlive a worker that exits without joining them
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
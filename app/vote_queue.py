@@ -0,0 +1,236 @@
+"""
+# Write-behind vote ingestion
+
+With VOTE_WRITE_BEHIND=true, POST /vote/ answers 202 as soon as the vote is queued.
+A background task started by the app's lifespan flushes the queue through VoteBatch
+every VOTE_FLUSH_MS or VOTE_FLUSH_SIZE votes, whichever comes first. One batch is
+one multi-row INSERT, one DELETE and the counter UPDATEs, so the votes on a hot post
+no longer queue up on its row lock one commit at a time. Counts lag by up to one
+flush interval. Votes on missing or own posts are only dropped at flush time.
+A flush that fails on a deadlock, a serialization failure or a lost connection is
+retried with backoff, the votes were already answered 202. Shutdown drains the
+queue before the app exits.
+"""
+import asyncio
+import logging
+import random
+import threading
+from typing import Optional
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import exc
+from . import schemas
+from .cache import post_cache
+from .config import settings
+from .database import AsyncSessionLocal, SessionLocal
+from .voting import VoteBatch
+
+logger = logging.getLogger("app.votes")
+
+class VoteQueueFull(Exception):
+    pass
+
+# Put on the queue by stop(), everything queued before it is flushed first
+_STOP = object()
+
+# serialization_failure and deadlock_detected: the transaction was rolled back and can simply run again
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+def _transient(
+    error: Exception
+):
+    if not isinstance(error, exc.DBAPIError):
+        return False
+    if isinstance(error, exc.OperationalError) or error.connection_invalidated:
+        return True
+    # asyncpg errors reach SQLAlchemy as generic DBAPI errors, their pgcode still tells them apart
+    return getattr(error.orig, "pgcode", None) in RETRYABLE_SQLSTATES
+
+class VoteQueue:
+    def __init__(
+        self,
+        flush_ms: float,
+        flush_size: int,
+        maxsize: int,
+        session_factory = SessionLocal,
+        async_session_factory = None,
+        retries: int = 3,
+        retry_ms: float = 50
+    ):
+        self.flush_interval = flush_ms / 1000
+        self.flush_size = flush_size
+        self.maxsize = maxsize
+        self.retries = retries
+        self.retry_interval = retry_ms / 1000
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        # (user_id, post_id, dir) queued and not flushed yet, sync routers submit from threadpool threads
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        # Through the same callback queue as submit(), so it lands behind every vote submitted before it
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _STOP)
+        await self._task
+
+    def submit(
+        self,
+        user_id: int,
+        vote: schemas.Vote
+    ):
+        # False when the same vote is still waiting to be flushed. Safe from any thread.
+        key = (user_id, vote.post_id, vote.dir)
+        if not self.running:
+            raise VoteQueueFull()
+        with self._lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.maxsize:
+                raise VoteQueueFull()
+            self._pending.add(key)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (user_id, vote))
+        return True
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = self._loop.time() + self.flush_interval
+            stopping = False
+            while len(batch) < self.flush_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    def _apply(
+        self,
+        batch: VoteBatch
+    ):
+        with self.session_factory() as db:
+            results = batch.apply(db)
+            db.commit()
+        return results
+
+    async def _apply_async(
+        self,
+        batch: VoteBatch
+    ):
+        async with self.async_session_factory() as db:
+            results = await batch.apply_async(db)
+            await db.commit()
+        return results
+
+    async def _write(
+        self,
+        batch: VoteBatch
+    ):
+        if self.async_session_factory is not None:
+            return await self._apply_async(batch)
+        return await asyncio.to_thread(self._apply, batch)
+
+    async def _flush(
+        self,
+        votes: list[tuple[int, schemas.Vote]]
+    ):
+        try:
+            for attempt in range(self.retries + 1):
+                batch = VoteBatch(votes)
+                try:
+                    results = await self._write(batch)
+                    break
+                except Exception as error:
+                    if attempt == self.retries or not _transient(error):
+                        raise
+                    self.retried += 1
+                    logger.warning("retrying a batch of %d votes: %s", len(votes), error.__class__.__name__)
+                    # Jittered, so workers that deadlocked on each other do not collide again
+                    await asyncio.sleep(self.retry_interval * 2 ** attempt * random.uniform(0.5, 1.5))
+        except Exception:
+            self.failed += len(votes)
+            logger.exception("dropped a batch of %d votes", len(votes))
+            return
+        finally:
+            with self._lock:
+                self._pending.difference_update((user_id, vote.post_id, vote.dir) for user_id, vote in votes)
+
+        self.batches += 1
+        self.flushed += len(votes)
+        self.rejected += sum(result.status_code >= 400 for result in results)
+        for post_id in batch.changed_posts:
+            post_cache.delete(post_id)
+
+    def stats(self):
+        return {
+            "enabled": settings.vote_write_behind,
+            "queued": len(self._pending),
+            "flushed": self.flushed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches
+        }
+
+vote_queue = VoteQueue(
+    settings.vote_flush_ms,
+    settings.vote_flush_size,
+    settings.vote_queue_size,
+    async_session_factory=AsyncSessionLocal if settings.database_async else None,
+    retries=settings.vote_flush_retries,
+    retry_ms=settings.vote_flush_retry_ms
+)
+
+def enqueue(
+    user_id: int,
+    vote: schemas.Vote
+):
+    # POST /vote/ in write-behind mode
+    try:
+        queued = vote_queue.submit(user_id, vote)
+    except VoteQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+
+    if not queued:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"user with {user_id} already has this vote on post {vote.post_id} queued"
+        )
+
+    return ORJSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"message": "vote queued"})
@@ -0,0 +1,122 @@
+"""
+# Applying many votes at once
+
+Used by POST /vote/batch. A batch costs a fixed number of statements whatever
+its size: one lookup of the posts' owners and the votes that already exist, one
+INSERT ... ON CONFLICT DO NOTHING, one bulk DELETE, and one UPDATE each for the posts'
+vote counts and their owners' user_stats. The votes are replayed in order in memory,
+so every vote gets the status code the single vote endpoint would have answered with
+had they been sent one by one, and only the net change per (user, post) is written.
+"""
+from collections import defaultdict
+from fastapi import status
+from . import queries, schemas
+
+class VoteBatch:
+    def __init__(
+        self, 
+        votes: list[tuple[int, schemas.Vote]]
+    ):
+        # (user_id, vote) in request order
+        self.votes = votes
+        self.results: list[schemas.VoteResult] = [None] * len(votes)
+        # (user_id, post_id) pairs whose vote has to be written or deleted once the batch is replayed
+        self.upvotes: set[tuple[int, int]] = set()
+        self.removals: set[tuple[int, int]] = set()
+        self.changed_posts: set[int] = set()
+        self.owners: dict[int, int] = {}
+
+    def _result(self, index: int, status_code: int, detail: str):
+        vote = self.votes[index][1]
+        self.results[index] = schemas.VoteResult(
+            post_id=vote.post_id, dir=vote.dir, status_code=status_code, detail=detail
+        )
+
+    def select_owners(self):
+        return queries.select_post_owners(sorted({(user_id, vote.post_id) for user_id, vote in self.votes}))
+
+    def plan(
+        self, 
+        rows: list
+    ):
+        # rows are (post_id, owner_id, user_id of an existing vote or None). The votes are replayed
+        # in order against the votes that already exist, so each one gets the status a single
+        # POST /vote/ at that point would have returned, and only the net change is written.
+        self.owners = {post_id: owner_id for post_id, owner_id, _ in rows}
+        existing = {(user_id, post_id) for post_id, _, user_id in rows if user_id is not None}
+        voted = set(existing)
+
+        for index, (user_id, vote) in enumerate(self.votes):
+            pair = (user_id, vote.post_id)
+            if vote.post_id not in self.owners:
+                self._result(index, status.HTTP_404_NOT_FOUND, f"Post wiht id: {vote.post_id} does not exits")
+            elif self.owners[vote.post_id] == user_id:
+                self._result(index, status.HTTP_403_FORBIDDEN, "You cannot vote on your own post")
+            elif vote.dir == schemas.VoteDir.UPVOTE:
+                if pair in voted:
+                    self._result(index, status.HTTP_409_CONFLICT, f"user with {user_id} has already voted on post {vote.post_id}")
+                else:
+                    voted.add(pair)
+                    self._result(index, status.HTTP_201_CREATED, "successfully added vote")
+            else:
+                if pair in voted:
+                    voted.discard(pair)
+                    self._result(index, status.HTTP_201_CREATED, "successfully deleted vote")
+                else:
+                    self._result(index, status.HTTP_404_NOT_FOUND, "Vote does not exits")
+
+        self.upvotes = voted - existing
+        self.removals = existing - voted
+
+    def vote_deltas(
+        self, 
+        added: list, 
+        removed: list
+    ):
+        deltas = defaultdict(int)
+        for _, post_id in added:
+            deltas[post_id] += 1
+        for _, post_id in removed:
+            deltas[post_id] -= 1
+        self.changed_posts = {post_id for post_id, delta in deltas.items() if delta}
+        return {post_id: delta for post_id, delta in deltas.items() if delta}
+
+    def received_deltas(
+        self, 
+        deltas: dict[int, int]
+    ):
+        # Post vote count changes summed per post owner, for user_stats.votes_received
+        received = defaultdict(int)
+        for post_id, delta in deltas.items():
+            received[self.owners[post_id]] += delta
+        return {owner_id: delta for owner_id, delta in received.items() if delta}
+
+    def apply(self, db):
+        self.plan(db.execute(self.select_owners()).all() if self.votes else [])
+
+        # Counts follow the rows actually written, a vote a concurrent request wrote first is not counted twice
+        added = db.execute(queries.insert_votes(list(self.upvotes))).all() if self.upvotes else []
+        removed = db.execute(queries.delete_votes(list(self.removals))).all() if self.removals else []
+
+        deltas = self.vote_deltas(added, removed)
+        if deltas:
+            db.execute(queries.change_vote_counts(deltas))
+        received = self.received_deltas(deltas)
+        if received:
+            db.execute(queries.change_votes_received(received))
+        return self.results
+
+    async def apply_async(self, db):
+        self.plan((await db.execute(self.select_owners())).all() if self.votes else [])
+
+        # Counts follow the rows actually written, a vote a concurrent request wrote first is not counted twice
+        added = (await db.execute(queries.insert_votes(list(self.upvotes)))).all() if self.upvotes else []
+        removed = (await db.execute(queries.delete_votes(list(self.removals)))).all() if self.removals else []
+
+        deltas = self.vote_deltas(added, removed)
+        if deltas:
+            await db.execute(queries.change_vote_counts(deltas))
+        received = self.received_deltas(deltas)
+        if received:
+            await db.execute(queries.change_votes_received(received))
+        return self.results
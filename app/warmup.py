@@ -0,0 +1,124 @@
+"""
+# Startup warm-up and readiness
+
+The app's lifespan awaits warm_up() before the worker accepts its first connection. It
+opens WARMUP_CONNECTIONS connections in every pool, starts the password hashing
+processes, loads the JWT backend, and runs the request and response models and the
+OpenAPI schema once. Without it the first requests of every worker pay for all of that.
+
+GET /healthz answers as soon as the process serves. GET /readyz answers 503 until warm-up
+is done and whenever the database is unreachable, and reports how long each step took.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from sqlalchemy import exc, text
+from . import database, oauth2, replicas, schemas, serialization, utils
+from .config import settings
+
+logger = logging.getLogger("app.startup")
+
+class StartupState:
+    def __init__(self):
+        self.warmed_up = False
+        # Milliseconds per warm-up step, plus their total
+        self.timings = {}
+
+state = StartupState()
+
+def _open_connections(
+    engine,
+    count: int
+):
+    # Held together, so the pool has to open `count` distinct connections, then handed back to it
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+async def _open_connections_async(
+    engine,
+    count: int
+):
+    connections = await asyncio.gather(*(engine.connect() for _ in range(count)))
+    await asyncio.gather(*(connection.close() for connection in connections))
+
+async def _open_connections_in_thread(
+    engine,
+    count: int
+):
+    await asyncio.to_thread(_open_connections, engine, count)
+
+async def _warm_pools():
+    # Connections past pool_size would be closed as soon as they are returned
+    count = min(settings.warmup_connections, settings.database_pool_size)
+    if settings.database_null_pool or count < 1:
+        return
+
+    if database.async_engine is not None:
+        primary, replica_set, open_connections = database.async_engine, replicas.async_replicas, _open_connections_async
+    else:
+        primary, replica_set, open_connections = database.engine, replicas.replicas, _open_connections_in_thread
+
+    await open_connections(primary, count)
+    for engine in replica_set.engines:
+        try:
+            await open_connections(engine, count)
+        except (exc.DBAPIError, OSError):
+            # Reads skip it until it answers again, like after a failed checkout
+            replica_set.mark_down(engine)
+            logger.warning("replica %s is unreachable", engine.url.render_as_string(hide_password=True))
+
+def _build_models(
+    app
+):
+    app.openapi()
+    now = datetime.now(timezone.utc)
+    schemas.UserCreate(email="warm-up@example.com", password="warm-up")
+    schemas.PostCreate(title="warm-up", content="warm-up")
+    schemas.Vote(post_id=0, dir=1)
+
+    owner = {"id": 0, "email": "warm-up@example.com", "created_at": now}
+    post = {"id": 0, "title": "", "content": "", "published": True, "created_at": now, "owner_id": 0, "owner": owner}
+    serialization.render(serialization.posts_out, [{"Post": post, "Votes": 0}])
+    serialization.render(serialization.user_out, owner)
+
+async def _timed(
+    name: str,
+    step
+):
+    start = time.perf_counter()
+    try:
+        await step
+    except Exception:
+        # Readiness still depends on the database check, a failed step only leaves that part cold
+        logger.exception("warm-up step %s failed", name)
+    state.timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+async def warm_up(
+    app
+):
+    start = time.perf_counter()
+    # Connecting and spawning the hashing processes both wait on something else, they overlap
+    await asyncio.gather(
+        _timed("pools", _warm_pools()),
+        _timed("password_hasher", utils.warm_up())
+    )
+    await _timed("jwt", asyncio.to_thread(oauth2.warm_up))
+    await _timed("models", asyncio.to_thread(_build_models, app))
+    state.timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    state.warmed_up = True
+    logger.info("warmed up in %.1f ms %s", state.timings["total_ms"], state.timings)
+
+def _ping(
+    engine
+):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+async def ping_database():
+    if database.async_engine is not None:
+        async with database.async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    else:
+        await asyncio.to_thread(_ping, database.engine)
@@ -0,0 +1,256 @@
+"""
+# Latency benchmarks
+
+    python -m benchmarks.run --users 200 --posts 5000 --votes 50000 --concurrency 32 --requests 1000
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --max-regression 0.2
+
+Seeds a separate <database_name>_bench database (like the tests use <database_name>_test),
+drives the routers in-process through httpx's ASGI transport and reports latency
+percentiles, throughput and SQL statements per request for every endpoint. With
+--baseline the exit code is 1 when an endpoint regressed past the allowed margin.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+import httpx
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app import database, replicas
+from app.cache import post_cache
+from app.config import settings
+from app.main import app
+from app.oauth2 import create_access_token
+from .seed import PASSWORD, seed
+
+BENCH_DATABASE_URL = f"{database.SQLALCHEMY_DATABASE_URL}_bench"
+
+# bcrypt dominates these, they get a fraction of --requests
+REQUEST_SHARE = {
+    "POST /login": 0.1,
+    "POST /users": 0.1
+}
+
+class StatementCounter:
+    def __init__(
+        self,
+        engine
+    ):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        with self._lock:
+            self.count += 1
+
+def make_scenarios(
+    data: dict,
+    rng: random.Random
+):
+    user_ids, post_ids = data["user_ids"], data["post_ids"]
+    tokens = {user_id: create_access_token({"user_id": user_id}) for user_id in user_ids}
+
+    def auth():
+        return {"Authorization": f"Bearer {tokens[rng.choice(user_ids)]}"}
+
+    def hot_post():
+        # Reads and votes follow the same skew as the seeded votes
+        return rng.choices(post_ids, cum_weights=data["cum_weights"])[0]
+
+    return {
+        "GET /posts": lambda: ("GET", "/posts/?limit=20", {"headers": auth()}),
+        "GET /posts/trending": lambda: ("GET", "/posts/trending?limit=20", {"headers": auth()}),
+        "GET /posts/{id}": lambda: ("GET", f"/posts/{hot_post()}", {"headers": auth()}),
+        "POST /vote": lambda: ("POST", "/vote/", {"headers": auth(), "json": {"post_id": hot_post(), "dir": rng.randint(0, 1)}}),
+        "POST /login": lambda: ("POST", "/login", {"data": {"username": f"user{rng.randrange(len(user_ids))}@bench.com", "password": PASSWORD}}),
+        "POST /users": lambda: ("POST", "/users/", {"json": {"email": f"{uuid.uuid4().hex}@bench.com", "password": PASSWORD}}),
+    }
+
+def percentile(
+    ordered: list[float],
+    p: float
+):
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_request,
+    requests: int,
+    concurrency: int
+):
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, kwargs = make_request()
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 500
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+async def bench(
+    engine,
+    data: dict,
+    requests: int,
+    concurrency: int,
+    async_url: str = None,
+    random_seed: int = 42
+):
+    # The app under test keeps its own routers and settings, only its sessions point at the seeded database
+    BenchSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = BenchSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    overrides = {database.get_db: override_get_db, replicas.get_read_db: override_get_db}
+    counted_engine = engine
+
+    if settings.database_async:
+        async_engine = create_async_engine(async_url, **database.pool_options(database.InstrumentedAsyncAdaptedQueuePool))
+        AsyncBenchSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+        async def override_get_async_db():
+            async with AsyncBenchSessionLocal() as db:
+                yield db
+
+        overrides[database.get_async_db] = override_get_async_db
+        overrides[replicas.get_async_read_db] = override_get_async_db
+        counted_engine = async_engine.sync_engine
+
+    app.dependency_overrides.update(overrides)
+    post_cache.clear()
+    counter = StatementCounter(counted_engine)
+    results = {}
+
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in make_scenarios(data, random.Random(random_seed)).items():
+                count = max(1, int(requests * REQUEST_SHARE.get(name, 1)))
+                statements_before = counter.count
+                latencies, errors, elapsed = await drive(client, make_request, count, concurrency)
+                ordered = sorted(latencies)
+
+                results[name] = {
+                    "requests": count,
+                    "errors": errors,
+                    "p50_ms": percentile(ordered, 50) * 1000,
+                    "p95_ms": percentile(ordered, 95) * 1000,
+                    "p99_ms": percentile(ordered, 99) * 1000,
+                    "throughput": count / elapsed,
+                    "statements_per_request": (counter.count - statements_before) / count
+                }
+    finally:
+        event.remove(counted_engine, "before_cursor_execute", counter._count)
+        for dependency in overrides:
+            app.dependency_overrides.pop(dependency, None)
+        if settings.database_async:
+            await async_engine.dispose()
+
+    return results
+
+def compare(
+    results: dict,
+    baseline: dict,
+    max_regression: float
+):
+    failures = []
+    for name, base in baseline["endpoints"].items():
+        current = results.get(name)
+        if current is None:
+            continue
+
+        if current["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {current['p95_ms']:.1f} ms, baseline {base['p95_ms']:.1f} ms")
+        if current["throughput"] < base["throughput"] * (1 - max_regression):
+            failures.append(f"{name}: {current['throughput']:.0f} req/s, baseline {base['throughput']:.0f} req/s")
+        # Statement counts do not jitter, any extra query per request is a regression (think N+1)
+        if current["statements_per_request"] > base["statements_per_request"] + 0.5:
+            failures.append(
+                f"{name}: {current['statements_per_request']:.1f} statements/request, "
+                f"baseline {base['statements_per_request']:.1f}"
+            )
+    return failures
+
+def print_report(
+    results: dict
+):
+    print(f"{'endpoint':<20}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'stmts/req':>11}")
+    for name, r in results.items():
+        print(
+            f"{name:<20}{r['requests']:>9}{r['errors']:>8}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            f"{r['p99_ms']:>9.1f}{r['throughput']:>9.0f}{r['statements_per_request']:>11.1f}"
+        )
+
+def ensure_database(
+    url: str
+):
+    server_url, name = url.rsplit("/", 1)
+    admin = create_engine(f"{server_url}/postgres", isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        exists = connection.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}).scalar()
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{name}"'))
+    admin.dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of post popularity")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against a baseline JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput regression, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    ensure_database(BENCH_DATABASE_URL)
+    engine = create_engine(BENCH_DATABASE_URL, **database.pool_options(database.InstrumentedQueuePool))
+    data = seed(engine, args.users, args.posts, args.votes, skew=args.skew, random_seed=args.seed)
+    print(f"Seeded {args.users} users, {args.posts} posts, {data['votes']} votes")
+
+    async_url = BENCH_DATABASE_URL.replace("+psycopg2", "+asyncpg", 1)
+    results = asyncio.run(bench(engine, data, args.requests, args.concurrency, async_url, args.seed))
+    engine.dispose()
+    print_report(results)
+
+    config = {key: getattr(args, key) for key in ("users", "posts", "votes", "skew", "requests", "concurrency", "seed")}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"config": config, "endpoints": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+
+        failures = compare(results, baseline, args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+# Seeded data for the benchmarks
+
+N users, M posts owned by random users, and votes whose post popularity follows
+a Zipf-like distribution, so a few hot posts collect most of the votes.
+"""
+import random
+from itertools import accumulate
+from sqlalchemy import exc, insert, text
+from sqlalchemy.orm import Session
+from app import models, trending, utils
+from app.database import Base
+from app.maintenance import rebuild_user_stats, reconcile_vote_counts
+
+PASSWORD = "password123"
+
+def create_schema(
+    engine
+):
+    # Same as tests/conftest.py: without pg_trgm the trigram index is left out
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except exc.DBAPIError:
+        for index in [i for i in models.Post.__table__.indexes if i.name == "ix_posts_title_trgm"]:
+            models.Post.__table__.indexes.discard(index)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+def seed(
+    engine, 
+    users: int, 
+    posts: int, 
+    votes: int, 
+    skew: float = 1.1, 
+    random_seed: int = 42
+):
+    rng = random.Random(random_seed)
+    create_schema(engine)
+
+    # bcrypt is deliberately slow, every seeded user shares one hash
+    password = utils.hash(PASSWORD)
+
+    with engine.begin() as connection:
+        user_ids = connection.execute(
+            insert(models.User).returning(models.User.id), 
+            [{"email": f"user{i}@bench.com", "password": password} for i in range(users)]
+        ).scalars().all()
+
+        post_rows = connection.execute(
+            insert(models.Post).returning(models.Post.id, models.Post.owner_id), 
+            [
+                {
+                    "title": f"post {i} about {rng.choice(['python', 'postgres', 'fastapi', 'caching', 'latency'])}", 
+                    "content": f"content of post {i} " * rng.randint(1, 20), 
+                    "owner_id": rng.choice(user_ids)
+                }
+                for i in range(posts)
+            ]
+        ).all()
+
+        owners = dict(post_rows)
+        post_ids = [post_id for post_id, _ in post_rows]
+        # Popularity by rank: weight 1 / rank^skew
+        cum_weights = list(accumulate(1 / (rank ** skew) for rank in range(1, len(post_ids) + 1)))
+
+        pairs = set()
+        for _ in range(10):
+            for post_id in rng.choices(post_ids, cum_weights=cum_weights, k=votes):
+                user_id = rng.choice(user_ids)
+                if owners[post_id] != user_id:
+                    pairs.add((user_id, post_id))
+            if len(pairs) >= votes:
+                break
+        pairs = set(list(pairs)[:votes])
+
+        if pairs:
+            connection.execute(
+                insert(models.Vote), 
+                [{"user_id": user_id, "post_id": post_id} for user_id, post_id in pairs]
+            )
+
+    with Session(engine) as db:
+        reconcile_vote_counts(db)
+        trending.refresh_scores(db)
+        rebuild_user_stats(db)
+
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+    return {
+        "user_ids": user_ids,
+        "post_ids": post_ids,
+        "owners": owners,
+        "cum_weights": cum_weights,
+        "votes": len(pairs)
+    }
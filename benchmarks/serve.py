@@ -0,0 +1,165 @@
+"""
+# Throughput by worker count
+
+    python -m benchmarks.serve --workers 1,4,16 --clients 4 --concurrency 64 --requests 4000
+
+Seeds the <database_name>_bench database like benchmarks.run, then for every worker count
+starts python -m app.serve against it and drives the read endpoints over real HTTP from
+--clients load-generating processes. Unlike benchmarks.run, which calls the app in-process,
+this measures the whole server: uvicorn, uvloop, httptools and one set of pools per worker.
+The load generators run on the same host, so give them some of its cores.
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from sqlalchemy import create_engine
+from app import database
+from app.config import settings
+from .run import BENCH_DATABASE_URL, drive, ensure_database, make_scenarios, percentile
+from .seed import seed
+
+ENDPOINTS = ("GET /posts", "GET /posts/trending", "GET /posts/{id}")
+
+def start_server(
+    workers: int,
+    port: int,
+    env: dict = None
+):
+    env = {
+        **os.environ,
+        "DATABASE_NAME": f"{settings.database_name}_bench",
+        # Only the requests under test touch the database
+        "TRENDING_REFRESH_SECONDS": "0",
+        **(env or {})
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.2)
+
+    stop_server(server)
+    raise SystemExit(f"python -m app.serve --workers {workers} did not start")
+
+def stop_server(
+    server: subprocess.Popen
+):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+def load(
+    port: int,
+    data: dict,
+    endpoint: str,
+    requests: int,
+    concurrency: int,
+    random_seed: int
+):
+    # Runs in a load-generating process, make_scenarios' lambdas cannot be sent to it
+    make_request = make_scenarios(data, random.Random(random_seed))[endpoint]
+
+    async def run():
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            return await drive(client, make_request, requests, concurrency)
+
+    return asyncio.run(run())
+
+def bench_workers(
+    pool: ProcessPoolExecutor,
+    clients: int,
+    port: int,
+    data: dict,
+    requests: int,
+    concurrency: int,
+    random_seed: int
+):
+    results = {}
+    per_client, client_concurrency = max(1, requests // clients), max(1, concurrency // clients)
+
+    for endpoint in ENDPOINTS:
+        # Warm-up, so every worker has opened its connections before the measured run
+        list(pool.map(load, *zip(*[(port, data, endpoint, concurrency, client_concurrency, random_seed + i) for i in range(clients)])))
+
+        start = time.perf_counter()
+        runs = list(pool.map(load, *zip(*[(port, data, endpoint, per_client, client_concurrency, random_seed + i) for i in range(clients)])))
+        elapsed = time.perf_counter() - start
+
+        ordered = sorted(latency for latencies, _, _ in runs for latency in latencies)
+        results[endpoint] = {
+            "requests": len(ordered),
+            "errors": sum(errors for _, errors, _ in runs),
+            "p50_ms": percentile(ordered, 50) * 1000,
+            "p95_ms": percentile(ordered, 95) * 1000,
+            "throughput": len(ordered) / elapsed
+        }
+    return results
+
+def print_report(
+    results: dict
+):
+    baseline = results[min(results)]
+    print(f"{'workers':>7}  {'endpoint':<20}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'req/s':>9}{'speedup':>9}")
+    for workers, endpoints in results.items():
+        for name, r in endpoints.items():
+            speedup = r["throughput"] / baseline[name]["throughput"]
+            print(
+                f"{workers:>7}  {name:<20}{r['requests']:>9}{r['errors']:>8}{r['p50_ms']:>9.1f}"
+                f"{r['p95_ms']:>9.1f}{r['throughput']:>9.0f}{speedup:>8.1f}x"
+            )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serve")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="comma separated worker counts")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=4000, help="requests per endpoint and worker count")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 1) // 4), help="load-generating processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    ensure_database(BENCH_DATABASE_URL)
+    engine = create_engine(BENCH_DATABASE_URL, **database.pool_options(database.InstrumentedQueuePool))
+    data = seed(engine, args.users, args.posts, args.votes, random_seed=args.seed)
+    engine.dispose()
+    print(f"Seeded {args.users} users, {args.posts} posts, {data['votes']} votes")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.clients) as pool:
+        for workers in sorted({int(count) for count in args.workers.split(",")}):
+            server = start_server(workers, args.port)
+            try:
+                results[workers] = bench_workers(
+                    pool, args.clients, args.port, data, args.requests, args.concurrency, args.seed
+                )
+            finally:
+                stop_server(server)
+
+    print_report(results)
+
+if __name__ == "__main__":
+    main()
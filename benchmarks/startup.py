@@ -0,0 +1,78 @@
+"""
+# Startup time and first-request latency
+
+    python -m benchmarks.startup --runs 3
+
+Starts python -m app.serve against the <database_name>_bench database with WARMUP off
+and on, and reports the time from spawning the process to GET /readyz answering 200,
+the warm-up steps /readyz reports, and the latency of the first requests the new
+worker serves. Warm-up moves those first-request costs in front of readiness.
+"""
+import argparse
+import statistics
+import time
+import httpx
+from sqlalchemy import create_engine
+from app.oauth2 import create_access_token
+from .run import BENCH_DATABASE_URL, ensure_database
+from .seed import PASSWORD, seed
+from .serve import start_server, stop_server
+
+def first_requests(
+    port: int,
+    data: dict
+):
+    # Each one is the first of its kind the worker serves
+    token = create_access_token({"user_id": data["user_ids"][0]})
+    headers = {"Authorization": f"Bearer {token}"}
+    requests = {
+        "POST /login": ("POST", "/login", {"data": {"username": "user0@bench.com", "password": PASSWORD}}),
+        "GET /posts": ("GET", "/posts/?limit=20", {"headers": headers}),
+        "GET /posts/{id}": ("GET", f"/posts/{data['post_ids'][0]}", {"headers": headers}),
+    }
+
+    latencies = {}
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+        for name, (method, url, kwargs) in requests.items():
+            start = time.perf_counter()
+            client.request(method, url, **kwargs).raise_for_status()
+            latencies[name] = (time.perf_counter() - start) * 1000
+    return latencies
+
+def measure(
+    port: int,
+    data: dict,
+    warmup: bool
+):
+    start = time.perf_counter()
+    server = start_server(1, port, {"WARMUP": "true" if warmup else "false"})
+    try:
+        ready_ms = (time.perf_counter() - start) * 1000
+        steps = httpx.get(f"http://127.0.0.1:{port}/readyz").json().get("warmup", {})
+        return {"ready_ms": ready_ms, **steps, **first_requests(port, data)}
+    finally:
+        stop_server(server)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--runs", type=int, default=3, help="server starts per mode, the median is reported")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    ensure_database(BENCH_DATABASE_URL)
+    engine = create_engine(BENCH_DATABASE_URL)
+    data = seed(engine, users=10, posts=100, votes=500)
+    engine.dispose()
+
+    results = {}
+    for warmup in (False, True):
+        runs = [measure(args.port, data, warmup) for _ in range(args.runs)]
+        results[warmup] = {key: statistics.median(run.get(key, 0) for run in runs) for key in runs[-1]}
+
+    keys = list(results[True])
+    print(f"{'ms (median)':<24}{'no warm-up':>12}{'warm-up':>12}")
+    for key in keys:
+        print(f"{key:<24}{results[False].get(key, 0):>12.1f}{results[True][key]:>12.1f}")
+
+if __name__ == "__main__":
+    main()
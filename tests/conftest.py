@@ -1,12 +1,20 @@
 import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database import get_db, Base
-from sqlalchemy import create_engine
+from app.database import get_db, get_async_db, instrument_engine, Base
+from app.profiling import ProfilingMiddleware
+from app.replicas import get_read_db, get_read_sessions, get_async_read_db, get_async_read_sessions
+from app.routers.aio import post as aio_post, user as aio_user, auth as aio_auth, vote as aio_vote
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 from app import models
+from app.cache import post_cache, post_owner_cache, user_cache
 from app.oauth2 import create_access_token
 from urllib.parse import quote_plus
 
@@ -19,14 +27,35 @@ SQLALCHEMY_DATABASE_URL = (
     f"{settings.database_port}/{settings.database_name}_test"
 )
 
+SQLALCHEMY_ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("+psycopg2", "+asyncpg", 1)
+
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+instrument_engine(engine)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def prepare_extensions():
+    # pg_trgm ships with the postgres images we deploy on, but not with every Postgres build.
+    # Without it the trigram index is left out and substring search runs unindexed.
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return
+    except exc.DBAPIError:
+        pass
+
+    trigram_index = next(i for i in models.Post.__table__.indexes if i.name == "ix_posts_title_trgm")
+    models.Post.__table__.indexes.discard(trigram_index)
+
+prepare_extensions()
+
 @pytest.fixture
 def session():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # Ids restart with the fresh tables, so nothing cached from a previous test may be served
+    for cache in (post_cache, user_cache, post_owner_cache):
+        cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -45,9 +74,35 @@ def client(
             session.close()
 
     app.dependency_overrides[get_db]= override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Streamed responses open their own sessions
+    app.dependency_overrides[get_read_sessions] = lambda: TestingSessionLocal
     yield TestClient(app)
     # the code will be run after our test
 
+@pytest.fixture
+def async_client(
+    session
+):
+    # TestClient runs every request on a fresh event loop, so connections must not be pooled across them
+    async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+    instrument_engine(async_engine.sync_engine)
+    AsyncTestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI(default_response_class=ORJSONResponse)
+    async_app.add_middleware(ProfilingMiddleware)
+    for module in (aio_vote, aio_post, aio_user, aio_auth):
+        async_app.include_router(module.router)
+
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_app.dependency_overrides[get_async_read_db] = override_get_async_db
+    async_app.dependency_overrides[get_async_read_sessions] = lambda: AsyncTestingSessionLocal
+    yield TestClient(async_app)
+
 @pytest.fixture
 def create_user(
     client
@@ -0,0 +1,100 @@
+from app import schemas
+
+def register(
+    client, 
+    email: str, 
+    password: str = "password123"
+):
+    response = client.post("/users/", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()
+
+def authorize(
+    client, 
+    create_token, 
+    user_id: int
+):
+    client.headers = {
+        **client.headers,
+        "Authorization": f"Bearer {create_token(user_id)}"
+    }
+    return client
+
+def test_async_create_user_and_login(
+    async_client
+):
+    user = register(async_client, "user@test.com")
+    duplicate = async_client.post("/users/", json={"email": "user@test.com", "password": "password123"})
+
+    response = async_client.post("/login", data={"username": "user@test.com", "password": "password123"})
+    wrong = async_client.post("/login", data={"username": "user@test.com", "password": "wrong"})
+
+    assert duplicate.status_code == 400
+    assert response.status_code == 200
+    assert schemas.Token(**response.json()).token_type == "bearer"
+    assert wrong.status_code == 401
+    assert async_client.get(f"/users/{user['id']}").json()["email"] == "user@test.com"
+
+def test_async_post_crud(
+    async_client, 
+    create_token
+):
+    user = register(async_client, "user@test.com")
+    client = authorize(async_client, create_token, user['id'])
+
+    created = [
+        schemas.Post(**client.post("/posts/", json={"title": f"title {i}", "content": "content"}).json())
+        for i in range(3)
+    ]
+    first_page = client.get("/posts/?limit=2")
+    second_page = client.get(f"/posts/?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+    post = schemas.PostOut(**client.get(f"/posts/{created[0].id}").json())
+
+    updated = client.put(f"/posts/{created[0].id}", json={"title": "new title", "content": "new content"})
+    deleted = client.delete(f"/posts/{created[1].id}")
+
+    assert created[0].owner.id == user['id']
+    assert len(first_page.json()) + len(second_page.json()) == 3
+    assert post.Post.id == created[0].id
+    assert schemas.Post(**updated.json()).title == "new title"
+    assert deleted.status_code == 204
+    assert client.get(f"/posts/{created[1].id}").status_code == 404
+
+def test_async_vote(
+    async_client, 
+    create_token, 
+    create_posts
+):
+    owner = register(async_client, "owner@test.com")
+    voter = register(async_client, "voter@test.com")
+    posts = create_posts(owner['id'])
+    client = authorize(async_client, create_token, voter['id'])
+
+    added = client.post("/vote/", json={"post_id": posts[0]['id'], "dir": 1})
+    again = client.post("/vote/", json={"post_id": posts[0]['id'], "dir": 1})
+    votes = client.get(f"/posts/{posts[0]['id']}").json()["Votes"]
+    removed = client.post("/vote/", json={"post_id": posts[0]['id'], "dir": 0})
+
+    assert added.status_code == 201
+    assert again.status_code == 409
+    assert votes == 1
+    assert removed.status_code == 201
+    assert client.get(f"/posts/{posts[0]['id']}").json()["Votes"] == 0
+
+def test_async_vote_batch(
+    async_client, 
+    create_token, 
+    create_posts
+):
+    owner = register(async_client, "owner@test.com")
+    voter = register(async_client, "voter@test.com")
+    posts = create_posts(owner['id'])
+    client = authorize(async_client, create_token, voter['id'])
+
+    response = client.post("/vote/batch", json=[
+        {"post_id": posts[0]['id'], "dir": 1},
+        {"post_id": posts[1]['id'], "dir": 0},
+    ])
+
+    assert [r["status_code"] for r in response.json()] == [201, 404]
+    assert client.get(f"/posts/{posts[0]['id']}").json()["Votes"] == 1
@@ -0,0 +1,25 @@
+import asyncio
+from benchmarks.run import bench, compare
+from benchmarks.seed import seed
+from tests.conftest import SQLALCHEMY_ASYNC_DATABASE_URL, engine
+
+def test_benchmark_smoke(
+    session
+):
+    data = seed(engine, users=5, posts=20, votes=100)
+    results = asyncio.run(bench(engine, data, requests=10, concurrency=2, async_url=SQLALCHEMY_ASYNC_DATABASE_URL))
+
+    assert set(results) == {"GET /posts", "GET /posts/trending", "GET /posts/{id}", "POST /vote", "POST /login", "POST /users"}
+    assert all(r["errors"] == 0 for r in results.values())
+    assert results["POST /vote"]["statements_per_request"] > 0
+    assert compare(results, {"endpoints": results}, 0.2) == []
+
+def test_benchmark_compare_flags_regressions():
+    base = {"p95_ms": 10.0, "throughput": 100.0, "statements_per_request": 2.0}
+    slower = {"p95_ms": 13.0, "throughput": 70.0, "statements_per_request": 21.0}
+
+    failures = compare({"GET /posts": slower}, {"endpoints": {"GET /posts": base}}, 0.2)
+
+    assert len(failures) == 3
+    assert all(failure.startswith("GET /posts") for failure in failures)
+    assert compare({"GET /posts": {**base, "p95_ms": 11.5}}, {"endpoints": {"GET /posts": base}}, 0.2) == []
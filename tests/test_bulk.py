@@ -0,0 +1,122 @@
+import json
+import pytest
+from sqlalchemy import text
+from app import models
+from app.config import settings
+
+@pytest.fixture(params=["insert", "copy"])
+def bulk_mode(
+    request,
+    monkeypatch
+):
+    # Every body is large enough for COPY when the threshold is 0
+    if request.param == "copy":
+        monkeypatch.setattr(settings, "post_bulk_copy_min_bytes", 0)
+    monkeypatch.setattr(settings, "post_bulk_chunk_size", 2)
+    monkeypatch.setattr(settings, "post_bulk_copy_chunk_size", 2)
+    return request.param
+
+def test_bulk_create_posts(
+    create_user,
+    authorized_client_factory,
+    bulk_mode,
+    session
+):
+    user = create_user("user@test.com")
+    client = authorized_client_factory(user["id"])
+    posts = [
+        {"title": "first", "content": "tab\there, \"quoted\", comma"},
+        {"title": "second", "content": "", "published": False},
+        {"title": "missing content"},
+        {"title": "third", "content": "line\nbreak"},
+    ]
+
+    response = client.post("/posts/bulk", json=posts)
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["created"] == 3 and body["failed"] == 1
+    assert [r["index"] for r in body["results"]] == [0, 1, 2, 3]
+    assert body["results"][2]["id"] is None and "content" in body["results"][2]["error"]
+
+    ids = [r["id"] for r in body["results"] if r["id"] is not None]
+    stored = {post.id: post for post in session.query(models.Post).filter(models.Post.id.in_(ids))}
+    assert [stored[id].title for id in ids] == ["first", "second", "third"]
+    assert stored[ids[0]].content == posts[0]["content"]
+    assert stored[ids[1]].content == "" and stored[ids[1]].published is False
+    assert stored[ids[2]].content == "line\nbreak"
+    assert client.get(f"/users/{user['id']}/stats").json()["post_count"] == 3
+
+def test_bulk_create_posts_ndjson(
+    create_user,
+    authorized_client_factory,
+    bulk_mode
+):
+    user = create_user("user@test.com")
+    client = authorized_client_factory(user["id"])
+    lines = [json.dumps({"title": f"post {i}", "content": "content"}) for i in range(5)] + ["not json"]
+
+    response = client.post(
+        "/posts/bulk",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    body = response.json()
+
+    assert body["created"] == 5 and body["failed"] == 1
+    assert body["results"][5]["error"].startswith("post: Invalid JSON")
+
+def test_bulk_rejected_chunk(
+    create_user,
+    authorized_client_factory,
+    bulk_mode,
+    session
+):
+    user = create_user("user@test.com")
+    client = authorized_client_factory(user["id"])
+    session.execute(text("""
+        CREATE OR REPLACE FUNCTION reject_post() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.title = 'reject' THEN RAISE EXCEPTION 'post rejected'; END IF;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """))
+    session.execute(text("CREATE TRIGGER reject_post BEFORE INSERT ON posts FOR EACH ROW EXECUTE FUNCTION reject_post()"))
+    session.commit()
+
+    response = client.post("/posts/bulk", json=[
+        {"title": "ok", "content": "content"},
+        {"title": "reject", "content": "content"},
+        {"title": "next chunk", "content": "content"},
+        {"title": "nul \u0000", "content": "content"},
+    ])
+    body = response.json()
+
+    # The failed chunk is rolled back as a whole, the next one still goes in
+    assert body["created"] == 1
+    assert [r["id"] is not None for r in body["results"]] == [False, False, True, False]
+    assert body["results"][0]["error"] == "chunk rejected by the database: post rejected"
+    assert body["results"][3]["error"] == "post: text cannot contain NUL characters"
+    assert client.get(f"/users/{user['id']}/stats").json()["post_count"] == 1
+
+def test_bulk_requires_array(
+    create_user,
+    authorized_client_factory
+):
+    user = create_user("user@test.com")
+    client = authorized_client_factory(user["id"])
+
+    assert client.post("/posts/bulk", json={"title": "title", "content": "content"}).status_code == 422
+
+def test_async_bulk_create_posts(
+    async_client,
+    create_token,
+    bulk_mode
+):
+    user = async_client.post("/users/", json={"email": "user@test.com", "password": "password123"}).json()
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {create_token(user['id'])}"}
+
+    response = async_client.post("/posts/bulk", json=[{"title": f"post {i}", "content": "content"} for i in range(3)])
+
+    assert response.json()["created"] == 3
+    assert async_client.get("/posts/?limit=10").json()[0]["Post"]["title"] == "post 2"
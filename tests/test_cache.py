@@ -0,0 +1,203 @@
+import re
+import time
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from app import models, oauth2
+from app.cache import RedisCache, TTLCache, post_cache, post_owner_cache, user_cache
+from app.config import settings
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_entry_ttl_only_shortens():
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("short", 1, ttl=-1)
+    cache.set("long", 2, ttl=3600)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    time.sleep(0.06)
+    assert cache.get("long") is None
+
+def test_verified_token_is_cached(
+    create_token
+):
+    token = create_token(42)
+    before = oauth2.token_cache.stats()
+
+    first = oauth2.verify_access_token(token, HTTPException(status_code=401))
+    second = oauth2.verify_access_token(token, HTTPException(status_code=401))
+    after = oauth2.token_cache.stats()
+
+    assert first.id == second.id == 42
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+def test_cached_token_expires_with_exp():
+    exp = int(time.time()) + 1
+    token = jwt.encode({"user_id": 42, "exp": exp}, settings.secret_key, algorithm=settings.algorithm)
+
+    oauth2.verify_access_token(token, HTTPException(status_code=401))
+    time.sleep(exp - time.time() + 0.05)
+    misses = oauth2.token_cache.stats()["misses"]
+
+    # Past exp the cached entry is gone, so the token is decoded (and judged) again
+    try:
+        oauth2.verify_access_token(token, HTTPException(status_code=401))
+    except HTTPException:
+        pass
+
+    assert oauth2.token_cache.stats()["misses"] == misses + 1
+
+def test_redis_cache_backend():
+    cache = RedisCache(fakeredis.FakeRedis(), ttl=60, namespace="post")
+
+    cache.set(1, b"cached")
+    hit = cache.get(1)
+    cache.delete(1)
+    miss = cache.get(1)
+    cache.set(2, b"cached")
+    cache.clear()
+
+    assert hit == b"cached"
+    assert miss is None
+    assert cache.get(2) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["hit_ratio"] == pytest.approx(1 / 3)
+
+def test_get_post_served_from_cache(
+    create_user, 
+    authorized_client_factory, 
+    create_posts
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    posts = create_posts(user['id'])
+    hits = post_cache.stats()["hits"]
+
+    first = auth_client.get(f"/posts/{posts[0]['id']}")
+    second = auth_client.get(f"/posts/{posts[0]['id']}")
+
+    assert first.json() == second.json()
+    assert post_cache.stats()["hits"] == hits + 1
+
+def test_update_post_invalidates_cache(
+    create_user, 
+    authorized_client_factory, 
+    create_posts
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    posts = create_posts(user['id'])
+
+    auth_client.get(f"/posts/{posts[0]['id']}")
+    auth_client.put(f"/posts/{posts[0]['id']}", json={"title": "new title", "content": "new content"})
+    response = auth_client.get(f"/posts/{posts[0]['id']}")
+
+    assert response.json()["Post"]["title"] == "new title"
+
+def test_delete_post_invalidates_cache(
+    create_user, 
+    authorized_client_factory, 
+    create_posts
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    posts = create_posts(user['id'])
+
+    auth_client.get(f"/posts/{posts[0]['id']}")
+    auth_client.delete(f"/posts/{posts[0]['id']}")
+
+    assert auth_client.get(f"/posts/{posts[0]['id']}").status_code == 404
+
+
+def statement_count(
+    response
+):
+    return int(re.search(r'"(\d+) statements"', response.headers["Server-Timing"]).group(1))
+
+def test_get_user_served_from_cache(
+    client, 
+    create_user
+):
+    user = create_user("user@test.com")
+
+    first = client.get(f"/users/{user['id']}")
+    second = client.get(f"/users/{user['id']}")
+
+    assert first.json() == second.json() == {k: user[k] for k in ("id", "email", "created_at")}
+    assert statement_count(second) == 0
+    assert user_cache.stats()["hits"] >= 1
+
+def test_owner_checks_use_cached_owner(
+    post_with_non_owner_client, 
+    create_token
+):
+    client, owner, post = (post_with_non_owner_client[key] for key in ("client", "owner", "post"))
+    owner_headers = {"Authorization": f"Bearer {create_token(owner['id'])}"}
+
+    client.get(f"/posts/{post['id']}")
+    update = client.put(f"/posts/{post['id']}", json={"title": "new title", "content": "new content"})
+    own_vote = client.post("/vote/", json={"post_id": post["id"], "dir": 1}, headers=owner_headers)
+
+    assert update.status_code == 403 and statement_count(update) == 0
+    assert own_vote.status_code == 403 and statement_count(own_vote) == 0
+
+def test_delete_post_invalidates_owner(
+    post_with_non_owner_client, 
+    create_token
+):
+    client, owner, post = (post_with_non_owner_client[key] for key in ("client", "owner", "post"))
+    owner_headers = {"Authorization": f"Bearer {create_token(owner['id'])}"}
+
+    client.get(f"/posts/{post['id']}")
+    deleted = client.delete(f"/posts/{post['id']}", headers=owner_headers)
+
+    assert deleted.status_code == 204
+    assert post_owner_cache.get(post["id"]) is None
+    assert client.put(f"/posts/{post['id']}", json={"title": "t", "content": "c"}, headers=owner_headers).status_code == 404
+
+def test_stale_owner_entry_answers_404(
+    post_with_non_owner_client, 
+    create_token, 
+    session
+):
+    # Another worker deleted the post, this one still caches its owner
+    client, owner, post = (post_with_non_owner_client[key] for key in ("client", "owner", "post"))
+    owner_headers = {"Authorization": f"Bearer {create_token(owner['id'])}"}
+    client.get(f"/posts/{post['id']}")
+    session.query(models.Post).filter(models.Post.id == post["id"]).delete()
+    session.commit()
+
+    response = client.delete(f"/posts/{post['id']}", headers=owner_headers)
+
+    assert response.status_code == 404
+    assert post_owner_cache.get(post["id"]) is None
+
+def test_create_post_rejects_token_of_deleted_user(
+    client, 
+    create_user, 
+    create_token, 
+    session
+):
+    user = create_user("user@test.com")
+    session.query(models.User).filter(models.User.id == user["id"]).delete()
+    session.commit()
+
+    response = client.post(
+        "/posts/", json={"title": "title", "content": "content"}, 
+        headers={"Authorization": f"Bearer {create_token(user['id'])}"}
+    )
+
+    assert response.status_code == 401
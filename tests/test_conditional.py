@@ -0,0 +1,82 @@
+from app.cache import post_cache
+
+def test_get_post_not_modified(
+    post_with_non_owner_client
+):
+    client, post = post_with_non_owner_client["client"], post_with_non_owner_client["post"]
+
+    response = client.get(f"/posts/{post['id']}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Served from the post cache the second time, with the same ETag
+    cached = client.get(f"/posts/{post['id']}")
+    assert cached.headers["ETag"] == etag
+    assert cached.content == response.content
+
+    not_modified = client.get(f"/posts/{post['id']}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+
+    # Weak tags and lists match too
+    assert client.get(f"/posts/{post['id']}", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(f"/posts/{post['id']}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # Also before the post is cached
+    post_cache.clear()
+    assert client.get(f"/posts/{post['id']}", headers={"If-None-Match": etag}).status_code == 304
+
+def test_post_etag_changes_with_votes_and_updates(
+    post_with_non_owner_client,
+    create_token
+):
+    client, owner, post = (post_with_non_owner_client[key] for key in ("client", "owner", "post"))
+    etag = client.get(f"/posts/{post['id']}").headers["ETag"]
+
+    client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+    voted = client.get(f"/posts/{post['id']}", headers={"If-None-Match": etag})
+    assert voted.status_code == 200
+    assert voted.json()["Votes"] == 1
+
+    client.put(
+        f"/posts/{post['id']}", json={"title": "updated title", "content": "updated content"},
+        headers={"Authorization": f"Bearer {create_token(owner['id'])}"}
+    )
+    updated = client.get(f"/posts/{post['id']}", headers={"If-None-Match": voted.headers["ETag"]})
+    assert updated.status_code == 200
+    assert updated.json()["Post"]["title"] == "updated title"
+
+def test_get_posts_not_modified(
+    post_with_non_owner_client
+):
+    client = post_with_non_owner_client["client"]
+
+    response = client.get("/posts/?limit=2&cursor=")
+    etag = response.headers["ETag"]
+    not_modified = client.get("/posts/?limit=2&cursor=", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    # Clients still need the cursor of the page they already have
+    assert not_modified.headers["X-Next-Cursor"] == response.headers["X-Next-Cursor"]
+
+    # Another page, or a vote on one of its posts, changes the tag
+    assert client.get("/posts/?limit=3", headers={"If-None-Match": etag}).status_code == 200
+    client.post("/vote/", json={"post_id": response.json()[0]["Post"]["id"], "dir": 1})
+    assert client.get("/posts/?limit=2&cursor=", headers={"If-None-Match": etag}).status_code == 200
+
+def test_async_conditional_get(
+    async_client,
+    create_token
+):
+    user = async_client.post("/users/", json={"email": "owner@test.com", "password": "password123"}).json()
+    headers = {"Authorization": f"Bearer {create_token(user['id'])}"}
+    post = async_client.post("/posts/", json={"title": "title", "content": "content"}, headers=headers).json()
+
+    etag = async_client.get(f"/posts/{post['id']}", headers=headers).headers["ETag"]
+    assert async_client.get(f"/posts/{post['id']}", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    async_client.put(f"/posts/{post['id']}", json={"title": "updated", "content": "content"}, headers=headers)
+    assert async_client.get(f"/posts/{post['id']}", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    page_etag = async_client.get("/posts/", headers=headers).headers["ETag"]
+    assert async_client.get("/posts/", headers={**headers, "If-None-Match": page_etag}).status_code == 304
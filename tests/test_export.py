@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timedelta, timezone
+from app import models
+from app.config import settings
+
+def export_lines(
+    response
+):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_export_streams_ndjson(
+    post_with_non_owner_client,
+    monkeypatch
+):
+    client, post = post_with_non_owner_client["client"], post_with_non_owner_client["post"]
+    client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+    # Smaller than the table, so the rows span several cursor fetches
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+
+    response = client.get("/posts/export", headers={"Accept-Encoding": "identity"})
+    posts = export_lines(response)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in response.headers
+    assert [p["id"] for p in posts] == [post["id"], post["id"] + 1, post["id"] + 2]
+    assert posts[0]["votes"] == 1
+    assert set(posts[0]) == {"id", "title", "content", "published", "created_at", "owner_id", "votes"}
+    assert posts[0]["created_at"].endswith("Z")
+
+def test_export_filters(
+    create_user,
+    authorized_client_factory,
+    create_posts,
+    session
+):
+    user = create_user("user@test.com")
+    other = create_user("other@test.com")
+    create_posts(user["id"])
+    create_posts(other["id"])
+    now = datetime.now(timezone.utc)
+    session.add(models.Post(title="old", content="content", owner_id=user["id"], created_at=now - timedelta(days=30)))
+    session.commit()
+    client = authorized_client_factory(user["id"])
+
+    by_owner = export_lines(client.get("/posts/export", params={"owner_id": other["id"]}))
+    recent = export_lines(client.get("/posts/export", params={"created_after": (now - timedelta(days=1)).isoformat()}))
+    old = export_lines(client.get("/posts/export", params={"created_before": (now - timedelta(days=1)).isoformat()}))
+
+    assert len(by_owner) == 3 and {p["owner_id"] for p in by_owner} == {other["id"]}
+    assert len(recent) == 6
+    assert [p["title"] for p in old] == ["old"]
+
+def test_export_gzip(
+    post_with_non_owner_client
+):
+    client = post_with_non_owner_client["client"]
+
+    response = client.get("/posts/export", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx decompresses the body
+    assert len(export_lines(response)) == 3
+
+def test_export_requires_login(
+    client
+):
+    assert client.get("/posts/export").status_code == 401
+
+def test_async_export(
+    async_client,
+    create_token
+):
+    user = async_client.post("/users/", json={"email": "user@test.com", "password": "password123"}).json()
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {create_token(user['id'])}"}
+    async_client.post("/posts/", json={"title": "title", "content": "content"})
+
+    response = async_client.get("/posts/export", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert [p["title"] for p in export_lines(response)] == ["title"]
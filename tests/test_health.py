@@ -0,0 +1,40 @@
+from app import warmup
+from app.config import settings
+
+def test_healthz(
+    client
+):
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+def test_readyz_waits_for_warm_up(
+    client,
+    monkeypatch
+):
+    monkeypatch.setattr(settings, "trending_refresh_seconds", 0)
+    monkeypatch.setattr(warmup, "state", warmup.StartupState())
+
+    # The lifespan only runs inside the with block
+    assert client.get("/readyz").status_code == 503
+
+    with client:
+        response = client.get("/readyz")
+
+    assert response.status_code == 200
+    timings = response.json()["warmup"]
+    assert set(timings) == {"pools_ms", "password_hasher_ms", "jwt_ms", "models_ms", "total_ms"}
+
+def test_readyz_reports_unreachable_database(
+    client,
+    monkeypatch
+):
+    monkeypatch.setattr(warmup.state, "warmed_up", True)
+
+    async def unreachable():
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(warmup, "ping_database", unreachable)
+
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "database unavailable"}
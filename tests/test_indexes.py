@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import delete, select
+from app import models, pagination, queries, schemas
+from benchmarks.seed import seed
+from tests.conftest import engine
+
+# Large enough that Postgres prefers an index whenever one applies
+USERS, POSTS, VOTES = 5000, 20000, 40000
+
+def router_statements(
+    data: dict
+):
+    user_id, post_id = data["user_ids"][0], data["post_ids"][0]
+    after = (datetime.now(timezone.utc), post_id)
+    statements = {
+        "list posts": pagination.posts_page("", schemas.SearchMode.SUBSTRING, None, 0, 10)[0],
+        "list posts after cursor": queries.select_posts("", after).limit(10),
+        "get post": queries.select_post(post_id),
+        "trending": queries.select_trending().limit(10),
+        "refresh scores": queries.refresh_post_scores(datetime.now(timezone.utc)),
+        "post by id": select(models.Post).where(models.Post.id == post_id),
+        "delete post": delete(models.Post).where(models.Post.id == post_id),
+        "user by email": select(models.User).where(models.User.email == "user1@bench.com"),
+        "user by id": select(models.User).where(models.User.id == user_id),
+        "upvote": queries.apply_vote(user_id, schemas.Vote(post_id=post_id, dir=1)),
+        "remove vote": queries.apply_vote(user_id, schemas.Vote(post_id=post_id, dir=0)),
+        "vote batch owners": queries.select_post_owners([(user_id, post_id), (user_id, post_id + 1)]),
+        "vote batch insert": queries.insert_votes([(user_id, post_id)]),
+        "vote batch delete": queries.delete_votes([(user_id, post_id)]),
+        "vote batch counts": queries.change_vote_counts({post_id: 1}),
+        # What ON DELETE CASCADE runs when a post or a user is deleted
+        "cascade post votes": select(models.Vote).where(models.Vote.post_id == post_id),
+        "cascade user posts": select(models.Post).where(models.Post.owner_id == user_id),
+    }
+
+    # Without pg_trgm (see conftest) substring search is unindexed by design
+    if any(index.name == "ix_posts_title_trgm" for index in models.Post.__table__.indexes):
+        statements["fulltext search"] = pagination.posts_page("python", schemas.SearchMode.FULLTEXT, None, 0, 10)[0]
+
+    return statements
+
+def explain(
+    connection,
+    statement
+):
+    compiled = statement.compile(bind=connection, compile_kwargs={"render_postcompile": True})
+    return "\n".join(connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars())
+
+@pytest.fixture(scope="module")
+def seeded():
+    return seed(engine, users=USERS, posts=POSTS, votes=VOTES)
+
+def test_router_queries_use_indexes(
+    seeded
+):
+    with engine.connect() as connection:
+        plans = {name: explain(connection, statement) for name, statement in router_statements(seeded).items()}
+
+    seq_scans = {name: plan for name, plan in plans.items() if "Seq Scan" in plan}
+    assert not seq_scans, "\n\n".join(f"{name}:\n{plan}" for name, plan in seq_scans.items())
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import replicas
+from app.database import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, pool_stats
+from app.replicas import ReplicaSet
+from app.config import settings
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+METRICS_HEADERS = {"X-Metrics-Token": "metrics-secret"}
+
+@pytest.fixture(autouse=True)
+def metrics_token(
+    monkeypatch
+):
+    monkeypatch.setattr(settings, "metrics_token", "metrics-secret")
+
+def test_metrics_require_token(
+    client, 
+    monkeypatch
+):
+    missing = client.get("/metrics/db-pool")
+    wrong = client.get("/metrics/db-pool", headers={"X-Metrics-Token": "guess"})
+    monkeypatch.setattr(settings, "metrics_token", None)
+    disabled = client.get("/metrics/db-pool", headers=METRICS_HEADERS)
+
+    assert [missing.status_code, wrong.status_code, disabled.status_code] == [404, 404, 404]
+
+def test_db_pool_metrics(
+    client
+):
+    response = client.get("/metrics/db-pool", headers=METRICS_HEADERS)
+    stats = response.json()["sync"]
+
+    assert response.status_code == 200
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert {"checked_out", "overflow", "checkout_wait_seconds"} <= stats.keys()
+
+def test_db_pool_metrics_async_replicas(
+    client, 
+    monkeypatch
+):
+    # Async mode reads through async_replicas, an ejected one must show up as unhealthy
+    replica = create_async_engine(
+        "postgresql+asyncpg://nobody@replica1/none", poolclass=InstrumentedAsyncAdaptedQueuePool
+    )
+    async_replicas = ReplicaSet([replica], retry_after=60)
+    async_replicas.mark_down(replica)
+    monkeypatch.setattr(settings, "database_async", True)
+    monkeypatch.setattr(replicas, "replicas", ReplicaSet([create_engine("postgresql+psycopg2://nobody@sync1/none")], retry_after=60))
+    monkeypatch.setattr(replicas, "async_replicas", async_replicas)
+
+    stats = client.get("/metrics/db-pool", headers=METRICS_HEADERS).json()["replicas"]
+
+    assert [(r["url"], r["healthy"], r["pool"]) for r in stats] == [
+        ("postgresql+asyncpg://nobody@replica1/none", False, "InstrumentedAsyncAdaptedQueuePool")
+    ]
+
+def test_token_cache_metrics(
+    authorized_client_factory, 
+    create_user
+):
+    user = create_user("user@test.com")
+    client = authorized_client_factory(user["id"])
+    client.get("/posts/")
+    client.get("/posts/")
+
+    stats = client.get("/metrics/token-cache", headers=METRICS_HEADERS).json()
+
+    assert stats["hits"] >= 1
+    assert 0 < stats["hit_ratio"] <= 1
+
+def test_cache_metrics(
+    client
+):
+    stats = client.get("/metrics/cache", headers=METRICS_HEADERS).json()["posts"]
+
+    assert stats["backend"] == "memory"
+    assert {"hit_ratio", "evictions"} <= stats.keys()
+
+def test_pool_records_checkout_wait_and_timeouts():
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, 
+        poolclass=InstrumentedQueuePool, 
+        pool_size=1, 
+        max_overflow=0, 
+        pool_timeout=0.1
+    )
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        stats = pool_stats(engine)
+
+    engine.dispose()
+
+    assert stats["checked_out"] == 1
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checkout_wait_seconds"]["count"] == 2
+    assert stats["checkout_wait_seconds"]["sum"] >= 0.1
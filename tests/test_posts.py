@@ -1,6 +1,9 @@
 import pytest
+import re
+from datetime import datetime, timezone
 from typing import List
-from app import schemas
+from app import models, queries, schemas
+from app.pagination import encode_cursor
 
 def test_get_all_posts(
     create_user,
@@ -260,4 +263,156 @@ def test_update_post_not_exist(
         json=updated_post
     )
 
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_get_posts_cursor_pagination(
+    create_user, 
+    authorized_client_factory, 
+    create_posts
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    posts = create_posts(user['id'])
+
+    first_page = auth_client.get("/posts/?limit=2")
+    next_cursor = first_page.headers["X-Next-Cursor"]
+    second_page = auth_client.get(f"/posts/?limit=2&cursor={next_cursor}")
+
+    first_ids = [p["Post"]["id"] for p in first_page.json()]
+    second_ids = [p["Post"]["id"] for p in second_page.json()]
+
+    assert first_page.status_code == 200
+    assert second_page.status_code == 200
+    assert len(first_ids) == 2
+    assert len(second_ids) == 1
+    assert sorted(first_ids + second_ids) == sorted(p['id'] for p in posts)
+    assert "X-Next-Cursor" not in second_page.headers
+
+def test_get_posts_cursor_exposed_to_cors(
+    create_user, 
+    authorized_client_factory, 
+    create_posts
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    create_posts(user['id'])
+
+    response = auth_client.get("/posts/?limit=2", headers={"Origin": "https://example.com"})
+    exposed = {header.strip().lower() for header in response.headers["Access-Control-Expose-Headers"].split(",")}
+
+    assert response.headers["X-Next-Cursor"]
+    assert {"x-next-cursor", "etag"} <= exposed
+
+def test_get_posts_invalid_cursor(
+    create_user, 
+    authorized_client_factory
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+
+    response = auth_client.get("/posts/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("search, expected_titles", [
+    ("content", {"first title", "second title", "third title"}),
+    ("second", {"second title"}),
+    # "thi" is no lexeme, the title substring fallback finds it
+    ("thi", {"third title"}),
+])
+def test_get_posts_fulltext_search(
+    create_user, 
+    authorized_client_factory, 
+    create_posts, 
+    search, 
+    expected_titles
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    create_posts(user['id'])
+
+    response = auth_client.get(f"/posts/?search={search}&search_mode=fulltext&limit=10")
+    titles = {p["Post"]["title"] for p in response.json()}
+
+    assert response.status_code == 200
+    assert titles == expected_titles
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_posts_fulltext_ranked_first(
+    create_user, 
+    authorized_client_factory, 
+    session
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    session.add_all([
+        models.Post(title="gardening", content="tomatoes", owner_id=user['id']),
+        models.Post(title="tomatoes", content="tomatoes and more tomatoes", owner_id=user['id']),
+    ])
+    session.commit()
+
+    response = auth_client.get("/posts/?search=tomatoes&search_mode=fulltext")
+
+    assert [p["Post"]["title"] for p in response.json()] == ["tomatoes", "gardening"]
+
+def test_get_posts_fulltext_rejects_cursor(
+    create_user, 
+    authorized_client_factory
+):
+    user = create_user("user@test.com")
+    auth_client = authorized_client_factory(user['id'])
+    cursor = encode_cursor(datetime.now(timezone.utc), 1)
+
+    response = auth_client.get(f"/posts/?search=title&search_mode=fulltext&cursor={cursor}")
+    assert response.status_code == 400
+
+
+def statement_count(
+    response
+):
+    return int(re.search(r'"(\d+) statements"', response.headers["Server-Timing"]).group(1))
+
+@pytest.mark.parametrize("path", ["/posts/?limit={limit}", "/posts/?limit={limit}&search=post&search_mode=fulltext"])
+def test_get_posts_statement_count_is_constant(
+    path, 
+    create_user, 
+    authorized_client_factory, 
+    session
+):
+    # Every post has its own owner, a lazy Post.owner would cost one extra SELECT per post
+    user = create_user("user@test.com")
+    emails = {f"owner{i}@test.com" for i in range(12)}
+    owners = [models.User(email=email, password="password123") for email in emails]
+    session.add_all(owners)
+    session.flush()
+    session.add_all([models.Post(title=f"post {i}", content="content", owner_id=owner.id) for i, owner in enumerate(owners)])
+    session.commit()
+    session.close()
+    auth_client = authorized_client_factory(user['id'])
+
+    small_page = auth_client.get(path.format(limit=1))
+    full_page = auth_client.get(path.format(limit=12))
+
+    assert len(full_page.json()) == 12
+    assert {p["Post"]["owner"]["email"] for p in full_page.json()} == emails
+    assert statement_count(full_page) == statement_count(small_page)
+
+def test_get_posts_fast_json_matches_schema(
+    create_user, 
+    authorized_client_factory, 
+    create_posts, 
+    session
+):
+    user = create_user("user@test.com")
+    create_posts(user['id'])
+    auth_client = authorized_client_factory(user['id'])
+
+    response = auth_client.get("/posts/")
+    expected = [
+        schemas.PostOut.model_validate(row, from_attributes=True).model_dump(mode="json")
+        for row in session.execute(queries.select_posts()).all()
+    ]
+    owner_schema = auth_client.get("/openapi.json").json()["components"]["schemas"]["UserOut"]
+
+    assert response.headers["content-type"] == "application/json"
+    assert [schemas.PostOut(**p).model_dump(mode="json") for p in response.json()] == expected
+    assert owner_schema["properties"]["email"]["format"] == "email"
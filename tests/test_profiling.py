@@ -0,0 +1,78 @@
+import logging
+import re
+from app.config import settings
+
+def server_timing(
+    response
+):
+    # {"db": (duration_ms, description), "app": (duration_ms, None)}
+    metrics = {}
+    for metric in response.headers["Server-Timing"].split(", "):
+        name, *params = metric.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(values["dur"]), values.get("desc", "").strip('"') or None)
+    return metrics
+
+def test_server_timing_counts_statements(
+    authorized_client_factory,
+    create_user,
+    create_posts
+):
+    user = create_user("user@test.com")
+    create_posts(user["id"])
+    client = authorized_client_factory(user["id"])
+
+    metrics = server_timing(client.get("/posts/"))
+    root = server_timing(client.get("/"))
+
+    assert int(re.match(r"(\d+) statements", metrics["db"][1]).group(1)) >= 1
+    assert metrics["db"][0] <= metrics["app"][0]
+    assert root["db"] == (0.0, "0 statements")
+
+def test_request_log_line(
+    client,
+    caplog
+):
+    with caplog.at_level(logging.INFO, logger="app.requests"):
+        client.get("/posts/")
+
+    record = next(r for r in caplog.records if r.name == "app.requests")
+    assert record.request["path"] == "/posts/"
+    assert record.request["status"] == 401
+    assert "db_statements=" in record.getMessage()
+
+def test_slow_request_logs_queries(
+    authorized_client_factory,
+    create_user,
+    create_posts,
+    caplog,
+    monkeypatch
+):
+    user = create_user("user@test.com")
+    create_posts(user["id"])
+    client = authorized_client_factory(user["id"])
+
+    monkeypatch.setattr(settings, "slow_request_ms", 0)
+    with caplog.at_level(logging.INFO, logger="app.requests"):
+        client.get("/posts/")
+
+    slow = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert slow and all("path=/posts/" in message for message in slow)
+    assert any("FROM posts" in message for message in slow)
+
+def test_slow_request_logging_is_opt_in(
+    client,
+    caplog
+):
+    with caplog.at_level(logging.INFO, logger="app.requests"):
+        client.get("/")
+
+    assert not [r for r in caplog.records if r.levelno == logging.WARNING]
+
+def test_async_server_timing(
+    async_client
+):
+    response = async_client.post("/users/", json={"email": "user@test.com", "password": "password123"})
+
+    assert response.status_code == 201
+    assert server_timing(response)["db"][1] != "0 statements"
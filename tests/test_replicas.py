@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app import replicas
+from app.cache import post_cache
+from app.main import app
+from app.replicas import ReplicaSet, get_read_db
+from tests.conftest import SQLALCHEMY_ASYNC_DATABASE_URL, TestingSessionLocal, engine
+
+@pytest.fixture
+def replica_client(
+    client,
+    monkeypatch
+):
+    # The test database plays the replica, primary sessions are counted to tell the two apart
+    primary_sessions = []
+
+    def primary_session(**kwargs):
+        if "bind" not in kwargs:
+            primary_sessions.append(1)
+        return TestingSessionLocal(**kwargs)
+
+    monkeypatch.setattr(replicas, "replicas", ReplicaSet([engine], retry_after=5))
+    monkeypatch.setattr(replicas, "SessionLocal", primary_session)
+    app.dependency_overrides.pop(get_read_db)
+    replicas.pinned_users.clear()
+    client.primary_sessions = primary_sessions
+    return client
+
+def test_round_robin_skips_replicas_marked_down():
+    replica_set = ReplicaSet(["a", "b", "c"], retry_after=60)
+
+    turns = [replica_set.candidates()[0] for _ in range(4)]
+    replica_set.mark_down("b")
+
+    assert turns == ["a", "b", "c", "a"]
+    assert "b" not in replica_set.candidates()
+    replica_set.mark_up("b")
+    assert "b" in replica_set.candidates()
+
+def test_unreachable_replica_is_marked_down():
+    unreachable = create_engine("postgresql+psycopg2://nobody@127.0.0.1:1/none")
+    replica_set = ReplicaSet([unreachable, engine], retry_after=60)
+
+    connection = replica_set.connect()
+    connection.close()
+
+    assert connection.engine is engine
+    assert replica_set.candidates() == [engine]
+    assert [replica["healthy"] for replica in replica_set.stats()] == [False, True]
+
+def test_async_unreachable_replica_is_marked_down():
+    unreachable = create_async_engine("postgresql+asyncpg://nobody@127.0.0.1:1/none", poolclass=NullPool)
+    reachable = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+    replica_set = ReplicaSet([unreachable, reachable], retry_after=60)
+
+    async def connect():
+        connection = await replica_set.connect_async()
+        await connection.close()
+        return connection
+
+    assert asyncio.run(connect()).engine is reachable
+    assert replica_set.candidates() == [reachable]
+
+def test_reads_go_to_replica(
+    replica_client,
+    create_user
+):
+    user = create_user("user@test.com")
+
+    response = replica_client.get(f"/users/{user['id']}")
+
+    assert response.status_code == 200
+    assert replica_client.primary_sessions == []
+
+def test_writer_is_pinned_to_primary(
+    replica_client,
+    create_user,
+    create_token
+):
+    writer = create_user("writer@test.com")
+    reader = create_user("reader@test.com")
+    writer_headers = {"Authorization": f"Bearer {create_token(writer['id'])}"}
+    reader_headers = {"Authorization": f"Bearer {create_token(reader['id'])}"}
+
+    replica_client.post("/posts/", json={"title": "title", "content": "content"}, headers=writer_headers)
+    writer_read = replica_client.get(f"/users/{reader['id']}", headers=writer_headers)
+    primary_reads = len(replica_client.primary_sessions)
+
+    reader_read = replica_client.get(f"/users/{writer['id']}", headers=reader_headers)
+
+    assert writer_read.status_code == 200 and reader_read.status_code == 200
+    assert primary_reads == 1
+    assert len(replica_client.primary_sessions) == 1
+
+def test_replica_reads_are_not_cached(
+    replica_client,
+    create_user,
+    create_token
+):
+    writer = create_user("writer@test.com")
+    reader = create_user("reader@test.com")
+    writer_headers = {"Authorization": f"Bearer {create_token(writer['id'])}"}
+    reader_headers = {"Authorization": f"Bearer {create_token(reader['id'])}"}
+    post = replica_client.post("/posts/", json={"title": "title", "content": "content"}, headers=writer_headers).json()
+
+    reader_read = replica_client.get(f"/posts/{post['id']}", headers=reader_headers)
+    cached_after_replica_read = post_cache.get(post['id'])
+    writer_read = replica_client.get(f"/posts/{post['id']}", headers=writer_headers)
+
+    assert reader_read.status_code == 200 and writer_read.status_code == 200
+    assert cached_after_replica_read is None
+    assert post_cache.get(post['id']) is not None
+
+def test_reads_fall_back_to_primary(
+    replica_client,
+    create_user,
+    monkeypatch
+):
+    user = create_user("user@test.com")
+    unreachable = create_engine("postgresql+psycopg2://nobody@127.0.0.1:1/none")
+    monkeypatch.setattr(replicas, "replicas", ReplicaSet([unreachable], retry_after=5))
+
+    response = replica_client.get(f"/users/{user['id']}")
+
+    assert response.status_code == 200
+    assert replica_client.primary_sessions == [1]
@@ -0,0 +1,66 @@
+import logging
+import logging.config
+import pytest
+from app import serve
+from app.config import settings
+
+def test_pools_fit_connection_budget(
+    monkeypatch
+):
+    monkeypatch.setattr(settings, "database_max_connections", 90)
+    monkeypatch.setattr(settings, "database_async", False)
+
+    assert serve.pool_limits(4) == (5, 10)
+    assert serve.pool_limits(16) == (5, 0)
+
+    monkeypatch.setattr(settings, "database_async", True)
+    pool_size, max_overflow = serve.pool_limits(16)
+    assert 16 * 2 * (pool_size + max_overflow) <= 90
+
+def test_budget_too_small_for_workers(
+    monkeypatch
+):
+    monkeypatch.setattr(settings, "database_max_connections", 10)
+
+    with pytest.raises(SystemExit):
+        serve.pool_limits(16)
+
+def test_worker_environment(
+    monkeypatch
+):
+    monkeypatch.setattr(settings, "database_max_connections", 90)
+    monkeypatch.setattr(settings, "database_async", False)
+    monkeypatch.setattr(settings, "password_hash_workers", None)
+    monkeypatch.setattr(serve, "cpu_count", lambda: 16)
+
+    assert serve.worker_environment(16) == {
+        "DATABASE_POOL_SIZE": "5",
+        "DATABASE_MAX_OVERFLOW": "0",
+        "PASSWORD_HASH_WORKERS": "1"
+    }
+
+    monkeypatch.setattr(settings, "database_null_pool", True)
+    monkeypatch.setattr(settings, "password_hash_workers", 0)
+    assert serve.worker_environment(16) == {}
+
+@pytest.fixture
+def served_logging(
+    capsys
+):
+    # After capsys, so the handler writes to the captured stderr
+    logging.config.dictConfig(serve.log_config())
+    yield
+    # Back to the test run's own logging, caplog relies on app.* propagating to the root logger
+    app_logger = logging.getLogger("app")
+    app_logger.handlers.clear()
+    app_logger.setLevel(logging.NOTSET)
+    app_logger.propagate = True
+
+def test_requests_are_logged(
+    served_logging,
+    client,
+    capsys
+):
+    client.get("/")
+
+    assert "method=GET path=/ status=200" in capsys.readouterr().err
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from app import models, trending
+
+def test_trending_orders_by_votes_and_age(
+    create_user,
+    authorized_client_factory,
+    session
+):
+    user = create_user("user@test.com")
+    now = datetime.now(timezone.utc)
+    session.add_all([
+        models.Post(title="old popular", content="content", owner_id=user['id'], vote_count=100, created_at=now - timedelta(days=2)),
+        models.Post(title="new", content="content", owner_id=user['id'], vote_count=1, created_at=now),
+        models.Post(title="new popular", content="content", owner_id=user['id'], vote_count=10, created_at=now),
+        models.Post(title="unscored", content="content", owner_id=user['id']),
+    ])
+    session.commit()
+    trending.refresh_scores(session)
+    session.query(models.PostScore).filter(
+        models.PostScore.post_id == session.query(models.Post.id).filter(models.Post.title == "unscored").scalar_subquery()
+    ).delete(synchronize_session=False)
+    session.commit()
+
+    response = authorized_client_factory(user['id']).get("/posts/trending")
+
+    assert response.status_code == 200
+    assert [p["Post"]["title"] for p in response.json()] == ["new popular", "new", "old popular"]
+
+def test_trending_requires_login(
+    client
+):
+    assert client.get("/posts/trending").status_code == 401
+
+def test_refresh_scores_is_incremental(
+    post_with_non_owner_client,
+    session
+):
+    client, post = post_with_non_owner_client["client"], post_with_non_owner_client["post"]
+    assert trending.refresh_scores(session) == 3
+    scored_at = session.get(models.PostScore, post["id"]).updated_at
+    since = datetime.now(timezone.utc)
+
+    assert trending.refresh_scores(session, since) == 0
+
+    client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+
+    assert trending.refresh_scores(session, since) == 1
+    session.expire_all()
+    assert session.get(models.PostScore, post["id"]).updated_at > scored_at
+
+def test_async_trending(
+    async_client,
+    create_token,
+    session
+):
+    user = async_client.post("/users/", json={"email": "user@test.com", "password": "password123"}).json()
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {create_token(user['id'])}"}
+    async_client.post("/posts/", json={"title": "title", "content": "content"})
+    trending.refresh_scores(session)
+
+    response = async_client.get("/posts/trending")
+
+    assert response.status_code == 200
+    assert [p["Post"]["title"] for p in response.json()] == ["title"]
@@ -0,0 +1,75 @@
+from app import maintenance, models
+
+def stats(
+    client,
+    user_id: int
+):
+    response = client.get(f"/users/{user_id}/stats")
+    assert response.status_code == 200
+    return response.json()
+
+def test_stats_follow_posts_and_votes(
+    create_user,
+    create_token,
+    client
+):
+    owner = create_user("owner@test.com")
+    voter = create_user("voter@test.com")
+    owner_headers = {"Authorization": f"Bearer {create_token(owner['id'])}"}
+    voter_headers = {"Authorization": f"Bearer {create_token(voter['id'])}"}
+
+    assert stats(client, owner["id"]) == {"user_id": owner["id"], "post_count": 0, "votes_received": 0}
+
+    first, second = (
+        client.post("/posts/", json={"title": "title", "content": "content"}, headers=owner_headers).json()
+        for _ in range(2)
+    )
+    client.post("/vote/", json={"post_id": first["id"], "dir": 1}, headers=voter_headers)
+    client.post("/vote/batch", json=[{"post_id": second["id"], "dir": 1}], headers=voter_headers)
+
+    assert stats(client, owner["id"]) == {"user_id": owner["id"], "post_count": 2, "votes_received": 2}
+
+    client.post("/vote/", json={"post_id": second["id"], "dir": 0}, headers=voter_headers)
+    client.delete(f"/posts/{first['id']}", headers=owner_headers)
+
+    assert stats(client, owner["id"]) == {"user_id": owner["id"], "post_count": 1, "votes_received": 0}
+    assert stats(client, voter["id"])["post_count"] == 0
+
+def test_stats_of_missing_user(
+    client
+):
+    assert client.get("/users/1/stats").status_code == 404
+
+def test_rebuild_user_stats(
+    post_with_non_owner_client,
+    session
+):
+    # create_posts writes posts straight to the table, bypassing the routers
+    client, owner, post = (post_with_non_owner_client[key] for key in ("client", "owner", "post"))
+    session.add(models.Vote(user_id=post_with_non_owner_client["voter"]["id"], post_id=post["id"]))
+    session.commit()
+    assert stats(client, owner["id"])["post_count"] == 0
+
+    assert maintenance.rebuild_user_stats(session) == 2
+    assert stats(client, owner["id"]) == {"user_id": owner["id"], "post_count": 3, "votes_received": 1}
+
+def test_async_user_stats(
+    async_client,
+    create_token
+):
+    owner = async_client.post("/users/", json={"email": "owner@test.com", "password": "password123"}).json()
+    voter = async_client.post("/users/", json={"email": "voter@test.com", "password": "password123"}).json()
+    post = async_client.post(
+        "/posts/", json={"title": "title", "content": "content"},
+        headers={"Authorization": f"Bearer {create_token(owner['id'])}"}
+    ).json()
+    async_client.post(
+        "/vote/", json={"post_id": post["id"], "dir": 1},
+        headers={"Authorization": f"Bearer {create_token(voter['id'])}"}
+    )
+
+    assert stats(async_client, owner["id"]) == {"user_id": owner["id"], "post_count": 1, "votes_received": 1}
+
+    async_client.delete(f"/posts/{post['id']}", headers={"Authorization": f"Bearer {create_token(owner['id'])}"})
+
+    assert stats(async_client, owner["id"]) == {"user_id": owner["id"], "post_count": 0, "votes_received": 0}
@@ -1,5 +1,6 @@
 import pytest
-from app import schemas
+import threading
+from app import schemas, utils
 from jose import jwt
 from app.config import settings
 
@@ -59,4 +60,24 @@ def test_incorrect_login(
             'password': password}
         )
 
-    assert response.status_code == status_code
\ No newline at end of file
+    assert response.status_code == status_code
+
+def test_create_user_hash_pool_saturated(
+    client, 
+    monkeypatch
+):
+    # A pool with no free slots must shed the request instead of queueing it
+    monkeypatch.setattr(settings, "password_hash_workers", 1)
+    monkeypatch.setattr(utils, "_slots", threading.BoundedSemaphore(1))
+    utils._slots.acquire()
+
+    response = client.post(
+        "/users/", 
+        json={
+            "email": "test12345@gmail.com", 
+            "password": "password123"
+            }
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
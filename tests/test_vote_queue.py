@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from sqlalchemy import exc
+from app import models, schemas
+from app.config import settings
+from app.vote_queue import VoteQueue, VoteQueueFull, vote_queue
+from tests.conftest import TestingSessionLocal
+
+@pytest.fixture
+def write_behind(
+    monkeypatch
+):
+    # Flushes go to the test database, the lifespan starts the queue when the TestClient is entered
+    monkeypatch.setattr(settings, "vote_write_behind", True)
+    monkeypatch.setattr(settings, "trending_refresh_seconds", 0)
+    monkeypatch.setattr(vote_queue, "session_factory", TestingSessionLocal)
+
+def test_queue_flushes_batches(
+    post_with_non_owner_client,
+    session
+):
+    owner, voter, post = (post_with_non_owner_client[key] for key in ("owner", "voter", "post"))
+    queue = VoteQueue(flush_ms=50, flush_size=2, maxsize=10, session_factory=TestingSessionLocal)
+
+    async def ingest():
+        queue.start()
+        queued = [
+            queue.submit(voter["id"], schemas.Vote(post_id=post["id"], dir=1)),
+            queue.submit(voter["id"], schemas.Vote(post_id=post["id"], dir=1)),
+            queue.submit(owner["id"], schemas.Vote(post_id=post["id"], dir=1)),
+            queue.submit(voter["id"], schemas.Vote(post_id=post["id"] + 1, dir=1)),
+        ]
+        await queue.stop()
+        return queued
+
+    assert asyncio.run(ingest()) == [True, False, True, True]
+    assert session.query(models.Vote).count() == 2
+    assert session.get(models.Post, post["id"]).vote_count == 1
+    assert queue.stats()["batches"] == 2
+    assert queue.stats()["rejected"] == 1
+    assert queue.stats()["queued"] == 0
+
+def test_queue_retries_transient_errors(
+    post_with_non_owner_client,
+    session
+):
+    voter, post = post_with_non_owner_client["voter"], post_with_non_owner_client["post"]
+    attempts = []
+
+    def flaky_session():
+        # The first flush fails the way a deadlock with another worker's flush would
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise exc.OperationalError("UPDATE posts", {}, Exception("deadlock detected"))
+        return TestingSessionLocal()
+
+    queue = VoteQueue(flush_ms=10, flush_size=10, maxsize=10, session_factory=flaky_session, retry_ms=1)
+
+    async def ingest():
+        queue.start()
+        queue.submit(voter["id"], schemas.Vote(post_id=post["id"], dir=1))
+        await queue.stop()
+
+    asyncio.run(ingest())
+
+    assert len(attempts) == 2
+    assert session.get(models.Post, post["id"]).vote_count == 1
+    assert queue.stats()["retried"] == 1
+    assert queue.stats()["failed"] == 0
+
+def test_write_behind_vote(
+    post_with_non_owner_client,
+    write_behind,
+    session
+):
+    client, post = post_with_non_owner_client["client"], post_with_non_owner_client["post"]
+
+    with client:
+        response = client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+        duplicate = client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+    # Leaving the client runs the lifespan shutdown, which drains the queue
+
+    assert response.status_code == 202
+    assert duplicate.status_code == 409
+    assert session.get(models.Post, post["id"]).vote_count == 1
+
+def test_write_behind_queue_full(
+    post_with_non_owner_client,
+    write_behind,
+    monkeypatch
+):
+    client, post = post_with_non_owner_client["client"], post_with_non_owner_client["post"]
+    monkeypatch.setattr(vote_queue, "maxsize", 0)
+
+    with client:
+        response = client.post("/vote/", json={"post_id": post["id"], "dir": 1})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_submit_requires_running_queue():
+    queue = VoteQueue(flush_ms=50, flush_size=2, maxsize=10)
+
+    with pytest.raises(VoteQueueFull):
+        queue.submit(1, schemas.Vote(post_id=1, dir=1))
@@ -1,5 +1,10 @@
 import pytest
-from app import models
+from concurrent.futures import ThreadPoolExecutor
+from app import models, schemas
+from app.config import settings
+from app.maintenance import reconcile_vote_counts
+from app.queries import apply_vote
+from tests.conftest import engine
 
 def test_vote_on_another_user_post(
     authorized_client_factory, 
@@ -103,4 +108,142 @@ def test_vote_unauthorized_user(client):
         }
     )
 
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_vote_updates_vote_count(
+    post_with_non_owner_client
+):
+    client = post_with_non_owner_client['client']
+    post_id = post_with_non_owner_client['post']['id']
+
+    client.post("/vote/", json={"post_id": post_id, "dir": 1})
+    assert client.get(f"/posts/{post_id}").json()["Votes"] == 1
+
+    client.post("/vote/", json={"post_id": post_id, "dir": 0})
+    assert client.get(f"/posts/{post_id}").json()["Votes"] == 0
+
+def test_reconcile_vote_counts(
+    session, 
+    post_with_non_owner_client
+):
+    client = post_with_non_owner_client['client']
+    post_id = post_with_non_owner_client['post']['id']
+    client.post("/vote/", json={"post_id": post_id, "dir": 1})
+
+    session.query(models.Post).update({models.Post.vote_count: 7}, synchronize_session=False)
+    session.commit()
+
+    fixed = reconcile_vote_counts(session)
+    counts = dict(session.query(models.Post.id, models.Post.vote_count).all())
+
+    assert fixed == 3
+    assert counts[post_id] == 1
+    assert sum(counts.values()) == 1
+
+def test_vote_batch(
+    create_user, 
+    create_posts, 
+    authorized_client_factory, 
+    session
+):
+    owner = create_user("owner@test.com")
+    voter = create_user("voter@test.com")
+    owner_posts = create_posts(owner['id'])
+    voter_posts = create_posts(voter['id'])
+    client = authorized_client_factory(voter['id'])
+    client.post("/vote/", json={"post_id": owner_posts[1]['id'], "dir": 1})
+
+    response = client.post("/vote/batch", json=[
+        {"post_id": owner_posts[0]['id'], "dir": 1},
+        {"post_id": owner_posts[1]['id'], "dir": 1},
+        {"post_id": owner_posts[2]['id'], "dir": 0},
+        {"post_id": voter_posts[0]['id'], "dir": 1},
+        {"post_id": 9999, "dir": 1},
+        {"post_id": owner_posts[2]['id'], "dir": 1},
+    ])
+    counts = dict(session.query(models.Post.id, models.Post.vote_count).all())
+
+    assert response.status_code == 200
+    assert [r["status_code"] for r in response.json()] == [201, 409, 404, 403, 404, 201]
+    assert counts[owner_posts[0]['id']] == 1
+    assert counts[owner_posts[1]['id']] == 1
+    assert counts[owner_posts[2]['id']] == 1
+    assert reconcile_vote_counts(session) == 0
+
+def test_vote_batch_replays_in_order(
+    create_user, 
+    create_posts, 
+    authorized_client_factory, 
+    session
+):
+    owner = create_user("owner@test.com")
+    voter = create_user("voter@test.com")
+    owner_posts = create_posts(owner['id'])
+    client = authorized_client_factory(voter['id'])
+    client.post("/vote/", json={"post_id": owner_posts[0]['id'], "dir": 1})
+
+    response = client.post("/vote/batch", json=[
+        {"post_id": owner_posts[0]['id'], "dir": 0},
+        {"post_id": owner_posts[0]['id'], "dir": 1},
+        {"post_id": owner_posts[1]['id'], "dir": 1},
+        {"post_id": owner_posts[1]['id'], "dir": 0},
+        {"post_id": owner_posts[1]['id'], "dir": 0},
+    ])
+    counts = dict(session.query(models.Post.id, models.Post.vote_count).all())
+
+    assert [r["status_code"] for r in response.json()] == [201, 201, 201, 201, 404]
+    assert counts[owner_posts[0]['id']] == 1
+    assert counts[owner_posts[1]['id']] == 0
+    assert reconcile_vote_counts(session) == 0
+
+def test_vote_batch_remove(
+    post_with_non_owner_client
+):
+    client = post_with_non_owner_client['client']
+    post_id = post_with_non_owner_client['post']['id']
+    client.post("/vote/", json={"post_id": post_id, "dir": 1})
+
+    response = client.post("/vote/batch", json=[
+        {"post_id": post_id, "dir": 0},
+    ])
+    again = client.post("/vote/batch", json=[
+        {"post_id": post_id, "dir": 0},
+    ])
+
+    assert response.json()[0]["status_code"] == 201
+    assert again.json()[0]["status_code"] == 404
+    assert client.get(f"/posts/{post_id}").json()["Votes"] == 0
+
+def test_vote_batch_too_large(
+    post_with_non_owner_client, 
+    monkeypatch
+):
+    client = post_with_non_owner_client['client']
+    monkeypatch.setattr(settings, "vote_batch_max_size", 1)
+
+    response = client.post("/vote/batch", json=[
+        {"post_id": 1, "dir": 1},
+        {"post_id": 2, "dir": 1},
+    ])
+    assert response.status_code == 413
+
+def test_concurrent_double_vote(
+    post_with_non_owner_client, 
+    session
+):
+    voter_id = post_with_non_owner_client['voter']['id']
+    post_id = post_with_non_owner_client['post']['id']
+    vote = schemas.Vote(post_id=post_id, dir=1)
+
+    # Racing transactions must settle on one vote, the rest see a conflict rather than an IntegrityError
+    def double_tap(_):
+        with engine.begin() as connection:
+            return connection.execute(apply_vote(voter_id, vote)).one().changed
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        changed = list(pool.map(double_tap, range(8)))
+
+    post = session.query(models.Post).filter(models.Post.id == post_id).one()
+
+    assert sorted(changed) == [0] * 7 + [1]
+    assert post.vote_count == 1